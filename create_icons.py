@@ -1,5 +1,8 @@
 """Скрипт для создания иконок PWA из существующего icon.png"""
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+import PIL
 from PIL import Image
 
 def create_pwa_icons():
@@ -13,17 +16,45 @@ def create_pwa_icons():
             print("Создайте icon.png размером не менее 512x512 пикселей")
             return
 
-        # Открываем исходную иконку
+        print(f"Используется Pillow {PIL.__version__}")
+
+        # Открываем исходную иконку и один раз приводим к RGBA
         img = Image.open(icon_path)
+        img.load()
+        img = img.convert("RGBA")
 
         # Список всех необходимых размеров иконок
         icon_sizes = [72, 96, 128, 144, 192, 512]
 
-        for size in icon_sizes:
-            icon_resized = img.resize((size, size), Image.Resampling.LANCZOS)
-            icon_path = os.path.join(app_dir, f'icon-{size}.png')
-            icon_resized.save(icon_path, 'PNG')
-            print(f"Создана иконка: icon-{size}.png")
+        def save_icon(size, icon):
+            # Иконки - генерируемые ресурсы: быстрое сжатие важнее размера
+            # (при необходимости их можно дожать оффлайн через optipng)
+            icon.save(os.path.join(app_dir, f'icon-{size}.png'), 'PNG',
+                      compress_level=1, optimize=False)
+            return size
+
+        # Уменьшаем каскадом: каждый следующий размер получаем из предыдущего
+        # (большего) промежуточного изображения, а не из оригинала.
+        # Кодирование PNG независимо для каждого размера и отпускает GIL,
+        # поэтому сохранение выполняется в пуле потоков параллельно с ресайзом.
+        with ThreadPoolExecutor(max_workers=min(len(icon_sizes), os.cpu_count() or 1)) as executor:
+            futures = []
+            prev = img
+            for size in sorted(icon_sizes, reverse=True):
+                if prev.size == (size, size):
+                    icon_resized = prev.copy()
+                else:
+                    # При большом коэффициенте сначала дёшево сжимаем целочисленным
+                    # box-фильтром (reduce), а LANCZOS применяем только на последнем шаге
+                    scale = min(prev.size) // (size * 2)
+                    if scale >= 2:
+                        prev = prev.reduce(scale)
+                    icon_resized = prev.resize((size, size), Image.Resampling.LANCZOS)
+                futures.append(executor.submit(save_icon, size, icon_resized))
+                prev = icon_resized
+
+            for future in futures:
+                print(f"Создана иконка: icon-{future.result()}.png")
 
         print("\nИконки PWA успешно созданы!")
         print("Теперь можно развернуть приложение в облаке.")
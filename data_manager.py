@@ -1,11 +1,37 @@
+import io
 import json
 import logging
 import os
+import secrets
 import sqlite3
 import sys
 import uuid
+import weakref
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
 
+try:
+    import ijson
+
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import zstandard
+
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 
@@ -17,21 +43,195 @@ def get_app_dir():
     return os.path.dirname(os.path.abspath(__file__))
 
 
+_CATEGORIES = {
+    "ТС": "ТС - Теплосеть (отопление + ГВС или перегретая вода)",
+    "ВО": "ВО - Хоз. бытовая канализация",
+    "ВС": "ВС - Водоснабжение (ХВС)",
+    "ЛК": "ЛК - Ливневая канализация",
+    "УУТЭ": "УУТЭ - Узел учета тепловой энергии",
+    "УУХВС": "УУХВС - Узел учета холодного водоснабжения"
+}
+
+
+@lru_cache(maxsize=1024)
 def get_category_description(category_code):
     """Получение полного описания категории по коду или кодам (с разделителями запятыми)."""
-    categories = {
-        "ТС": "ТС - Теплосеть (отопление + ГВС или перегретая вода)",
-        "ВО": "ВО - Хоз. бытовая канализация",
-        "ВС": "ВС - Водоснабжение (ХВС)",
-        "ЛК": "ЛК - Ливневая канализация",
-        "УУТЭ": "УУТЭ - Узел учета тепловой энергии",
-        "УУХВС": "УУХВС - Узел учета холодного водоснабжения"
-    }
     if not category_code:
         return "Не указана"
-    codes = category_code.split(",")
-    descriptions = [categories.get(code.strip(), code.strip() or "Не указана") for code in codes]
-    return ", ".join(descriptions)
+    return ", ".join(
+        _CATEGORIES.get(code.strip(), code.strip() or "Не указана") for code in category_code.split(",")
+    )
+
+
+# Столбцы, добавленные после первой версии схемы: таблица -> ((столбец, тип), ...)
+_MIGRATED_COLUMNS = {
+    "elements": (("sign_date", "TEXT"), ("category", "TEXT")),
+    "registry": (("category", "TEXT"),),
+}
+
+# SQL-запросы DataManager: один экземпляр строки на запрос,
+# подготовленные выражения переиспользуются из кэша соединения
+_SQL_SELECT_ELEMENTS = """
+                       SELECT id,
+                              name,
+                              type,
+                              parent_id,
+                              COALESCE(shelf, ''),
+                              COALESCE(rack, ''),
+                              COALESCE(doc_number, ''),
+                              COALESCE(sign_date, ''),
+                              COALESCE(category, '')
+                       FROM elements
+                       """
+_SQL_INSERT_ELEMENT = (
+    "INSERT INTO elements (id, name, type, parent_id, shelf, rack, doc_number, sign_date, category) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_SQL_UPDATE_ELEMENT = (
+    "UPDATE elements SET name = ?, type = ?, parent_id = ?, shelf = ?, rack = ?, doc_number = ?, "
+    "sign_date = ?, category = ? WHERE id = ?"
+)
+_SQL_DELETE_ELEMENT = "DELETE FROM elements WHERE id = ?"
+_SQL_DETACH_CHILDREN = "UPDATE elements SET parent_id = NULL WHERE parent_id = ?"
+_SQL_SELECT_REGISTRY = (
+    "SELECT id, name, type, COALESCE(doc_number, ''), COALESCE(sign_date, ''), COALESCE(status, ''), "
+    "COALESCE(category, '') FROM registry"
+)
+_SQL_INSERT_REGISTRY = (
+    "INSERT INTO registry (id, name, type, doc_number, sign_date, status, category) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+_SQL_UPDATE_REGISTRY = (
+    "UPDATE registry SET name = ?, type = ?, doc_number = ?, sign_date = ?, status = ?, category = ? "
+    "WHERE id = ?"
+)
+_SQL_DELETE_FROM_REGISTRY = "DELETE FROM registry WHERE id = ?"
+# Поисковый индекс реестра: FTS5 с триграммами ищет подстроку без учёта регистра.
+# Индекс хранит собственную копию полей и связан с реестром по id (а не по rowid,
+# который у таблицы с TEXT-ключом может измениться при VACUUM)
+_SQL_CREATE_REGISTRY_FTS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS registry_fts USING fts5("
+    "id UNINDEXED, name, type, doc_number, sign_date, status, category, tokenize = 'trigram')"
+)
+_SQL_REGISTRY_FTS_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS registry_fts_ai AFTER INSERT ON registry BEGIN
+        INSERT INTO registry_fts (id, name, type, doc_number, sign_date, status, category)
+        VALUES (new.id, new.name, new.type, new.doc_number, new.sign_date, new.status, new.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS registry_fts_ad AFTER DELETE ON registry BEGIN
+        DELETE FROM registry_fts WHERE id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS registry_fts_au AFTER UPDATE ON registry BEGIN
+        DELETE FROM registry_fts WHERE id = old.id;
+        INSERT INTO registry_fts (id, name, type, doc_number, sign_date, status, category)
+        VALUES (new.id, new.name, new.type, new.doc_number, new.sign_date, new.status, new.category);
+    END
+    """,
+)
+_SQL_FILL_REGISTRY_FTS = (
+    "INSERT INTO registry_fts (id, name, type, doc_number, sign_date, status, category) "
+    "SELECT id, name, type, doc_number, sign_date, status, category FROM registry"
+)
+# Постраничная выборка: порядок по rowid (порядок добавления) стабилен между страницами;
+# LIMIT -1 - без ограничения
+_SQL_SELECT_REGISTRY_PAGE = _SQL_SELECT_REGISTRY + " ORDER BY rowid LIMIT ? OFFSET ?"
+_SQL_SEARCH_REGISTRY = (
+    _SQL_SELECT_REGISTRY + " WHERE id IN (SELECT id FROM registry_fts WHERE registry_fts MATCH ?)"
+    " ORDER BY rowid LIMIT ? OFFSET ?"
+)
+# Выгрузка для синхронизации в порядке ID: порядок строк файла не зависит от rowid,
+# который меняется при переимпорте, поэтому неизменённые данные дают тот же файл
+_SQL_EXPORT_ELEMENTS = _SQL_SELECT_ELEMENTS.rstrip() + " ORDER BY id"
+_SQL_EXPORT_REGISTRY = _SQL_SELECT_REGISTRY + " ORDER BY id"
+# Триграммный индекс не находит строки короче трёх символов
+_FTS_MIN_QUERY_LENGTH = 3
+_SQL_SELECT_BOXES = "SELECT id, name FROM elements WHERE type = 'Коробка' ORDER BY name"
+# UNION (а не UNION ALL) защищает от зацикливания при битой иерархии
+_SQL_DOCUMENTS_IN_BOX = """
+                        WITH RECURSIVE sub(id, name, type, doc_number, sign_date, category) AS (
+                            SELECT id, name, type, doc_number, sign_date, category
+                            FROM elements
+                            WHERE parent_id = ?
+                            UNION
+                            SELECT e.id, e.name, e.type, e.doc_number, e.sign_date, e.category
+                            FROM elements e
+                                     JOIN sub ON e.parent_id = sub.id
+                            WHERE sub.type IN ('Папка', 'Коробка')
+                        )
+                        SELECT id, name, COALESCE(doc_number, ''), COALESCE(sign_date, ''), COALESCE(category, '')
+                        FROM sub
+                        WHERE type = 'Документ'
+                        """
+
+
+# Буфер файла синхронизации: запись и чтение идут крупными блоками, а не по 8 КБ
+_SYNC_BUFFER_SIZE = 1024 * 1024
+# Версия формата NDJSON-файла синхронизации (строка-заголовок export_to_ndjson)
+_SYNC_FORMAT_VERSION = "2.0"
+# Размер пачки executemany при построчном импорте NDJSON
+_IMPORT_BATCH_SIZE = 1000
+
+
+@contextmanager
+def _open_sync_file(path, mode):
+    """Открытие файла синхронизации в двоичном режиме ("rb" или "wb") с большим буфером.
+
+    Файлы с расширением .zst прозрачно сжимаются и распаковываются zstd (нужен zstandard).
+    """
+    if not str(path).endswith(".zst"):
+        with open(path, mode, buffering=_SYNC_BUFFER_SIZE) as f:
+            yield f
+        return
+    if not ZSTD_AVAILABLE:
+        raise RuntimeError("Для сжатых файлов синхронизации (.zst) требуется пакет zstandard")
+    with open(path, mode) as raw:
+        if mode == "wb":
+            with zstandard.ZstdCompressor(level=3, threads=-1).stream_writer(raw, closefd=False) as writer:
+                yield writer
+        else:
+            reader = zstandard.ZstdDecompressor().stream_reader(raw, closefd=False)
+            # BufferedReader добавляет построчное чтение поверх потока распаковки
+            yield io.BufferedReader(reader, _SYNC_BUFFER_SIZE)
+
+
+def _iter_json_items(json_file, key=None):
+    """Потоковое чтение элементов массива из JSON файла.
+
+    key - имя массива в корневом объекте, None - корневой массив.
+    При наличии ijson файл разбирается потоково, без загрузки целиком в память.
+    """
+    if IJSON_AVAILABLE:
+        with open(json_file, "rb", buffering=_SYNC_BUFFER_SIZE) as f:
+            yield from ijson.items(f, f"{key}.item" if key else "item", buf_size=_SYNC_BUFFER_SIZE)
+    else:
+        # Без ijson файл разбирается целиком - через orjson, если он установлен
+        with open(json_file, "rb") as f:
+            raw = f.read()
+        data = orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
+        yield from (data.get(key, []) if key else data)
+
+
+def _json_bytes(obj):
+    """Компактная сериализация в UTF-8 байты (через orjson, если он установлен)."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _write_json_array(f, items):
+    """Потоковая запись массива JSON: по одной записи на строку. Возвращает число записей."""
+    count = 0
+    for item in items:
+        f.write(b",\n    " if count else b"\n    ")
+        f.write(_json_bytes(item))
+        count += 1
+    f.write(b"\n  ]" if count else b"]")
+    return count
 
 
 class DataManager:
@@ -41,20 +241,33 @@ class DataManager:
         os.makedirs(self.data_dir, exist_ok=True)
         self.db_file = db_file or os.path.join(self.data_dir, 'archive.db')
         logger.info(f"Используется БД: {self.db_file}")
-        self.conn = sqlite3.connect(self.db_file)
+        self.conn = sqlite3.connect(self.db_file, cached_statements=256)
         self.conn.execute("PRAGMA foreign_keys = ON")
+        # WAL + synchronous=NORMAL: без fsync на каждый commit, устойчиво к сбоям приложения
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute("PRAGMA temp_store = MEMORY")
+        self.conn.execute("PRAGMA cache_size = -20000")  # ~20 МБ кэша страниц
+        self.conn.execute("PRAGMA mmap_size = 268435456")  # 256 МБ memory-mapped I/O
+        # Общий курсор для всех операций менеджера (результаты сразу выбираются fetchall)
+        self._cur = self.conn.cursor()
+        self._in_batch = False
+        # Отложенные фиксации других владельцев общего соединения (модель окна просмотра)
+        self._pending_writers = []
         self.create_tables()
         self.migrate_schema()
+        self.registry_search_indexed = self._create_registry_search_index()
         self.shelves = ["А", "Б", "В", "Г"]
         self.elements = []
+        self._by_id = {}
+        self._children = {}
         self._elements_loaded = False
         logger.info("Инициализация DataManager завершена")
 
     def create_tables(self):
         try:
             logger.info("Создание таблиц в базе данных")
-            cursor = self.conn.cursor()
-            cursor.execute("""
+            self._cur.execute("""
                            CREATE TABLE IF NOT EXISTS elements
                            (
                                id
@@ -91,7 +304,14 @@ class DataManager:
                            )
                                )
                            """)
-            cursor.execute("""
+            # Составной индекс покрывает и поиск по одному parent_id (префикс индекса)
+            self._cur.execute("CREATE INDEX IF NOT EXISTS idx_parent_type ON elements(parent_id, type)")
+            # Равенство по type / type+shelf / type+shelf+rack (фильтры окна просмотра, выборка коробок);
+            # заменяет прежний индекс только по type, который стал его префиксом
+            self._cur.execute("CREATE INDEX IF NOT EXISTS idx_type_shelf_rack ON elements(type, shelf, rack)")
+            self._cur.execute("DROP INDEX IF EXISTS idx_type")
+            self._cur.execute("CREATE INDEX IF NOT EXISTS idx_shelf ON elements(shelf)")
+            self._cur.execute("""
                            CREATE TABLE IF NOT EXISTS registry
                            (
                                id
@@ -127,109 +347,260 @@ class DataManager:
     def migrate_schema(self):
         try:
             logger.info("Проверка и миграция схемы базы данных")
-            cursor = self.conn.cursor()
-            cursor.execute("PRAGMA table_info(elements)")
-            columns = [col[1] for col in cursor.fetchall()]
-            if "sign_date" not in columns:
-                cursor.execute("ALTER TABLE elements ADD COLUMN sign_date TEXT")
-                logger.info("Добавлен столбец sign_date в таблицу elements")
-            if "category" not in columns:
-                cursor.execute("ALTER TABLE elements ADD COLUMN category TEXT")
-                logger.info("Добавлен столбец category в таблицу elements")
-            cursor.execute("PRAGMA table_info(registry)")
-            columns = [col[1] for col in cursor.fetchall()]
-            if "category" not in columns:
-                cursor.execute("ALTER TABLE registry ADD COLUMN category TEXT")
-                logger.info("Добавлен столбец category в таблицу registry")
-            self.conn.commit()
+            missing = []
+            for table, columns in _MIGRATED_COLUMNS.items():
+                self._cur.execute(f"PRAGMA table_info({table})")
+                existing = {col[1] for col in self._cur.fetchall()}
+                missing.extend((table, name, col_type) for name, col_type in columns if name not in existing)
+            if not missing:
+                return
+            # DDL в sqlite3 по умолчанию фиксируется сразу - объединяем ALTER в одну транзакцию
+            with self.conn:
+                self._cur.execute("BEGIN")
+                for table, name, col_type in missing:
+                    self._cur.execute(f"ALTER TABLE {table} ADD COLUMN {name} {col_type}")
+                    logger.info(f"Добавлен столбец {name} в таблицу {table}")
         except Exception as e:
             logger.error(f"Ошибка при миграции схемы: {e}")
             raise
 
+    @staticmethod
+    def _element_from_row(row):
+        return {
+            "ID": row[0],
+            "Название": row[1],
+            "Тип": row[2],
+            "Родитель ID": row[3],
+            "Стеллаж": row[4],
+            "Полка": row[5],
+            "Номер документа": row[6],
+            "Дата подписания": row[7],
+            "Категория": row[8]
+        }
+
     def load_elements(self):
         """Загрузка всех элементов из БД с поддержкой категорий."""
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                           SELECT id,
-                                  name,
-                                  type,
-                                  parent_id,
-                                  shelf,
-                                  rack,
-                                  doc_number,
-                                  sign_date,
-                                  category
-                           FROM elements
-                           """)
-            return [
-                {
-                    "ID": row[0],
-                    "Название": row[1],
-                    "Тип": row[2],
-                    "Родитель ID": row[3],
-                    "Стеллаж": row[4],
-                    "Полка": row[5],
-                    "Номер документа": row[6],
-                    "Дата подписания": row[7],
-                    "Категория": row[8] or ""
-                }
-                for row in cursor.fetchall()
-            ]
+            self._cur.execute(_SQL_SELECT_ELEMENTS)
+            return [self._element_from_row(row) for row in self._cur.fetchall()]
         except Exception as e:
             logger.error(f"Ошибка загрузки элементов: {e}")
             return []
 
+    def _create_registry_search_index(self):
+        """Создание поискового индекса реестра и триггеров, поддерживающих его актуальность.
+
+        Возвращает False, если SQLite собран без FTS5 - тогда search_registry ищет перебором.
+        """
+        try:
+            self._cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'registry_fts'")
+            exists = self._cur.fetchone() is not None
+            self._cur.execute(_SQL_CREATE_REGISTRY_FTS)
+            for trigger in _SQL_REGISTRY_FTS_TRIGGERS:
+                self._cur.execute(trigger)
+            if not exists:
+                self._cur.execute(_SQL_FILL_REGISTRY_FTS)
+                self.conn.commit()
+                logger.info("Создан поисковый индекс реестра")
+            return True
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Полнотекстовый поиск по реестру недоступен: {e}")
+            return False
+
+    @staticmethod
+    def _registry_from_row(row):
+        return {
+            "ID": row[0],
+            "Название": row[1],
+            "Тип": row[2],
+            "Номер документа": row[3],
+            "Дата подписания": row[4],
+            "Статус": row[5],
+            "Категория": row[6]
+        }
+
     def load_registry(self):
         """Загрузка данных из таблицы реестра с поддержкой категорий."""
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT id, name, type, doc_number, sign_date, status, category FROM registry")
-            return [
-                {
-                    "ID": row[0],
-                    "Название": row[1],
-                    "Тип": row[2],
-                    "Номер документа": row[3],
-                    "Дата подписания": row[4],
-                    "Статус": row[5],
-                    "Категория": row[6] or ""
-                }
-                for row in cursor.fetchall()
-            ]
+            self._cur.execute(_SQL_SELECT_REGISTRY)
+            return [self._registry_from_row(row) for row in self._cur.fetchall()]
         except Exception as e:
             logger.error(f"Ошибка загрузки реестра: {e}")
             return []
 
+    def search_registry(self, text, limit=-1, offset=0):
+        """Записи реестра, в любом поле которых встречается text (без учёта регистра).
+
+        limit/offset задают страницу результата (limit=-1 - все записи начиная с offset).
+        """
+        text = text.strip()
+        try:
+            if not text:
+                self._cur.execute(_SQL_SELECT_REGISTRY_PAGE, (limit, offset))
+                return [self._registry_from_row(row) for row in self._cur.fetchall()]
+            if self.registry_search_indexed and len(text) >= _FTS_MIN_QUERY_LENGTH:
+                # Весь запрос - одна фраза в кавычках: операторы FTS5 в тексте не разбираются
+                self._cur.execute(_SQL_SEARCH_REGISTRY, ('"' + text.replace('"', '""') + '"', limit, offset))
+                return [self._registry_from_row(row) for row in self._cur.fetchall()]
+        except Exception as e:
+            logger.error(f"Ошибка поиска в реестре: {e}")
+            return []
+        needle = text.casefold()
+        found = [
+            reg for reg in self.search_registry("")
+            if any(needle in str(value).casefold() for value in reg.values())
+        ]
+        return found[offset:] if limit < 0 else found[offset:offset + limit]
+
+    @staticmethod
+    def _registry_params(document):
+        """Значения полей документа реестра в порядке столбцов (без id)."""
+        return (
+            document["Название"],
+            document["Тип"],
+            document.get("Номер документа"),
+            document.get("Дата подписания"),
+            document.get("Статус"),
+            document.get("Категория")
+        )
+
+    def add_to_registry(self, documents):
+        """Добавление документов в реестр одним executemany. Возвращает список новых ID.
+
+        documents - словари в формате load_registry (без "ID").
+        """
+        try:
+            ids = [secrets.token_hex(8) for _ in documents]
+            self._cur.executemany(
+                _SQL_INSERT_REGISTRY,
+                ((el_id, *self._registry_params(document)) for el_id, document in zip(ids, documents))
+            )
+            self._commit()
+            logger.info(f"Добавлено документов в реестр: {len(ids)}")
+            return ids
+        except Exception as e:
+            logger.error(f"Ошибка добавления в реестр: {e}")
+            raise
+
+    def update_registry(self, el_id, document):
+        try:
+            self._cur.execute(_SQL_UPDATE_REGISTRY, (*self._registry_params(document), el_id))
+            self._commit()
+            logger.info(f"Документ реестра обновлен: {el_id}")
+        except Exception as e:
+            logger.error(f"Ошибка обновления документа реестра: {e}")
+            raise
+
     def delete_from_registry(self, el_id):
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("DELETE FROM registry WHERE id = ?", (el_id,))
-            self.conn.commit()
+            self._cur.execute(_SQL_DELETE_FROM_REGISTRY, (el_id,))
+            self._commit()
             logger.info(f"Документ удален из реестра: {el_id}")
         except Exception as e:
             logger.error(f"Ошибка удаления из реестра: {e}")
             raise
 
+    def _commit(self):
+        """Фиксация изменений; внутри batch() откладывается до выхода из блока.
+
+        Отложенные правки окна просмотра на общем соединении фиксируются вместе с ними.
+        """
+        if not self._in_batch:
+            self.conn.commit()
+
+    def add_pending_writer(self, flush):
+        """Регистрация метода, фиксирующего отложенные правки на общем соединении.
+
+        Ссылка слабая: закрытое окно не удерживается менеджером.
+        """
+        self._pending_writers.append(weakref.WeakMethod(flush))
+
+    def flush_pending_writes(self):
+        """Фиксация отложенных чужих правок, чтобы они не попали в транзакцию менеджера."""
+        if self._in_batch:
+            return
+        alive = []
+        for ref in self._pending_writers:
+            flush = ref()
+            if flush is not None:
+                flush()
+                alive.append(ref)
+        self._pending_writers = alive
+
+    @contextmanager
+    def batch(self):
+        """Группировка add/edit/delete-операций в одну транзакцию с одной фиксацией.
+
+        При исключении внутри блока все изменения откатываются, а кэш
+        элементов сбрасывается (он мог успеть обновиться по отменённым строкам).
+        Отложенные правки окна просмотра фиксируются до начала блока и под
+        откат не попадают.
+        """
+        if self._in_batch:
+            yield self
+            return
+        self.flush_pending_writes()
+        self._in_batch = True
+        try:
+            yield self
+        except Exception:
+            self.conn.rollback()
+            self.invalidate_cache()
+            raise
+        else:
+            self.conn.commit()
+        finally:
+            self._in_batch = False
+
+    @contextmanager
+    def _read_snapshot(self):
+        """Несколько SELECT из одного снимка БД: читающая транзакция WAL на время блока."""
+        self.flush_pending_writes()
+        if self.conn.in_transaction:
+            yield
+            return
+        self.conn.execute("BEGIN")
+        try:
+            yield
+        finally:
+            self.conn.rollback()  # изменений нет - транзакция просто завершается
+
     def _ensure_elements_loaded(self):
         if not self._elements_loaded:
-            self.elements = self.load_elements()
-            self._elements_loaded = True
+            self._set_cache(self.load_elements())
 
-    def find_by_id(self, el_id):
-        """Находит элемент по ID с принудительным обновлением данных из БД."""
-        try:
-            logger.debug(f"Поиск элемента по ID: {el_id}")
-            self.elements = self.load_elements()
-            self._elements_loaded = True
+    def _set_cache(self, elements):
+        """Заполнение кэша и индексов (по ID и по родителю) готовым списком элементов."""
+        self.elements = elements
+        self._by_id = {el["ID"]: el for el in elements}
+        self._children = {}
+        for el in elements:
+            self._children.setdefault(el["Родитель ID"] or None, []).append(el)
+        self._elements_loaded = True
 
-            for el in self.elements:
-                if str(el["ID"]) == str(el_id):
-                    logger.debug(f"Элемент найден: {el}")
-                    return el
+    def get_elements(self):
+        """Список элементов из кэша (без повторной выборки из БД).
 
-            logger.warning(f"Элемент с ID {el_id} не найден в базе данных")
-            return None
+        Словари общие с кэшем менеджера - вызывающий код не должен их изменять.
+        """
+        self._ensure_elements_loaded()
+        return self.elements
+
+    def invalidate_cache(self):
+        """Сброс кэша элементов: следующее обращение перечитает данные из БД."""
+        self.elements = []
+        self._by_id = {}
+        self._children = {}
+        self._elements_loaded = False
+
+    def find_by_id(self, el_id):
+        """Находит элемент по ID в кэше элементов (загружается из БД при первом обращении)."""
+        try:
+            self._ensure_elements_loaded()
+            el = self._by_id.get(str(el_id))
+            if el is None:
+                logger.warning(f"Элемент с ID {el_id} не найден в базе данных")
+            return el
         except Exception as e:
             logger.error(f"Ошибка в find_by_id: {e}")
             return None
@@ -237,33 +608,38 @@ class DataManager:
     def _would_create_cycle(self, el_id, new_parent_id):
         if new_parent_id == el_id:
             return True
+        # Поднимаемся по предкам через индекс кэша, без обращений к БД
+        self._ensure_elements_loaded()
+        visited = set()
         temp = new_parent_id
-        while temp:
+        while temp and temp not in visited:
             if temp == el_id:
                 return True
-            parent = self.find_by_id(temp)
-            temp = parent.get("Родитель ID") if parent else None
+            visited.add(temp)
+            parent = self._by_id.get(temp)
+            temp = parent["Родитель ID"] if parent else None
         return False
 
+    @staticmethod
+    def _element_params(el_id, element):
+        """Параметры _SQL_INSERT_ELEMENT для словаря элемента."""
+        return (
+            el_id,
+            element["Название"],
+            element["Тип"],
+            element["Родитель ID"] or None,
+            element["Стеллаж"] or None,
+            element["Полка"] or None,
+            element.get("Номер документа") or None,
+            element.get("Дата подписания") or None,
+            element.get("Категория") or None
+        )
+
     def add_element(self, element):
         try:
             el_id = str(uuid.uuid4())
-            cursor = self.conn.cursor()
-            cursor.execute(
-                "INSERT INTO elements (id, name, type, parent_id, shelf, rack, doc_number, sign_date, category) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                (
-                    el_id,
-                    element["Название"],
-                    element["Тип"],
-                    element["Родитель ID"] or None,
-                    element["Стеллаж"] or None,
-                    element["Полка"] or None,
-                    element.get("Номер документа") or None,
-                    element.get("Дата подписания") or None,
-                    element.get("Категория") or None
-                )
-            )
-            self.conn.commit()
+            self._cur.execute(_SQL_INSERT_ELEMENT, self._element_params(el_id, element))
+            self._commit()
             self._add_to_cache(el_id, element)
             logger.info(f"Элемент добавлен: {element['Название']} (ID: {el_id})")
             return el_id
@@ -271,6 +647,23 @@ class DataManager:
             logger.error(f"Ошибка добавления элемента: {e}")
             raise
 
+    def add_elements_bulk(self, elements):
+        """Добавление нескольких элементов одной транзакцией. Возвращает список новых ID."""
+        try:
+            ids = [str(uuid.uuid4()) for _ in elements]
+            self._cur.executemany(
+                _SQL_INSERT_ELEMENT,
+                (self._element_params(el_id, element) for el_id, element in zip(ids, elements))
+            )
+            self._commit()
+            for el_id, element in zip(ids, elements):
+                self._add_to_cache(el_id, element)
+            logger.info(f"Добавлено элементов: {len(ids)}")
+            return ids
+        except Exception as e:
+            logger.error(f"Ошибка пакетного добавления элементов: {e}")
+            raise
+
     def _add_to_cache(self, el_id, element):
         if self._elements_loaded:
             new_element = {
@@ -285,6 +678,8 @@ class DataManager:
                 "Категория": element.get("Категория") or ""
             }
             self.elements.append(new_element)
+            self._by_id[el_id] = new_element
+            self._children.setdefault(new_element["Родитель ID"] or None, []).append(new_element)
 
     def edit_element(self, el_id, element):
         try:
@@ -292,9 +687,8 @@ class DataManager:
             new_parent = element["Родитель ID"]
             if new_parent and self._would_create_cycle(el_id, new_parent):
                 raise ValueError("Это создаст циклическую зависимость в иерархии")
-            cursor = self.conn.cursor()
-            cursor.execute(
-                "UPDATE elements SET name = ?, type = ?, parent_id = ?, shelf = ?, rack = ?, doc_number = ?, sign_date = ?, category = ? WHERE id = ?",
+            self._cur.execute(
+                _SQL_UPDATE_ELEMENT,
                 (
                     element["Название"],
                     element["Тип"],
@@ -307,7 +701,7 @@ class DataManager:
                     el_id
                 )
             )
-            self.conn.commit()
+            self._commit()
             self._update_cache(el_id, element)
             logger.info(f"Элемент с ID {el_id} успешно отредактирован")
         except ValueError as ve:
@@ -319,27 +713,30 @@ class DataManager:
 
     def _update_cache(self, el_id, element):
         if self._elements_loaded:
-            for i, el in enumerate(self.elements):
-                if el["ID"] == el_id:
-                    self.elements[i].update({
-                        "Название": element["Название"],
-                        "Тип": element["Тип"],
-                        "Родитель ID": element["Родитель ID"] or "",
-                        "Стеллаж": element["Стеллаж"] or "",
-                        "Полка": element["Полка"] or "",
-                        "Номер документа": element["Номер документа"] or "",
-                        "Дата подписания": element["Дата подписания"] or "",
-                        "Категория": element.get("Категория") or ""
-                    })
-                    break
+            el = self._by_id.get(el_id)
+            if el is not None:
+                old_parent = el["Родитель ID"] or None
+                el.update({
+                    "Название": element["Название"],
+                    "Тип": element["Тип"],
+                    "Родитель ID": element["Родитель ID"] or "",
+                    "Стеллаж": element["Стеллаж"] or "",
+                    "Полка": element["Полка"] or "",
+                    "Номер документа": element["Номер документа"] or "",
+                    "Дата подписания": element["Дата подписания"] or "",
+                    "Категория": element.get("Категория") or ""
+                })
+                new_parent = el["Родитель ID"] or None
+                if new_parent != old_parent:
+                    self._children[old_parent].remove(el)
+                    self._children.setdefault(new_parent, []).append(el)
 
     def delete_element(self, el_id):
         try:
             logger.info(f"Удаление элемента с ID: {el_id}")
-            cursor = self.conn.cursor()
-            cursor.execute("DELETE FROM elements WHERE id = ?", (el_id,))
-            cursor.execute("UPDATE elements SET parent_id = NULL WHERE parent_id = ?", (el_id,))
-            self.conn.commit()
+            self._cur.execute(_SQL_DELETE_ELEMENT, (el_id,))
+            self._cur.execute(_SQL_DETACH_CHILDREN, (el_id,))
+            self._commit()
             self._remove_from_cache(el_id)
             logger.info(f"Элемент с ID {el_id} успешно удален")
         except Exception as e:
@@ -348,10 +745,16 @@ class DataManager:
 
     def _remove_from_cache(self, el_id):
         if self._elements_loaded:
-            self.elements = [el for el in self.elements if el["ID"] != el_id]
-            for el in self.elements:
-                if el["Родитель ID"] == el_id:
-                    el["Родитель ID"] = ""
+            removed = self._by_id.pop(el_id, None)
+            if removed is not None:
+                self.elements = [el for el in self.elements if el["ID"] != el_id]
+                self._children[removed["Родитель ID"] or None].remove(removed)
+            # Дочерние элементы удалённого становятся корневыми
+            orphans = self._children.pop(el_id, [])
+            for el in orphans:
+                el["Родитель ID"] = ""
+            if orphans:
+                self._children.setdefault(None, []).extend(orphans)
 
     def get_containers(self, el_type):
         try:
@@ -372,13 +775,15 @@ class DataManager:
             if parent:
                 subtree.append(parent)
 
-            def collect_children(current_id):
-                for el in self.elements:
-                    if el["Родитель ID"] == current_id:
-                        subtree.append(el)
-                        collect_children(el["ID"])
-
-            collect_children(parent_id)
+            # Обход в глубину без рекурсии: стек итераторов по дочерним элементам
+            stack = [iter(self._children.get(parent_id, ()))]
+            while stack:
+                el = next(stack[-1], None)
+                if el is None:
+                    stack.pop()
+                    continue
+                subtree.append(el)
+                stack.append(iter(self._children.get(el["ID"], ())))
             logger.debug(f"Поддерево для {parent_id}: {len(subtree)} элементов")
             return subtree
         except Exception as e:
@@ -386,28 +791,59 @@ class DataManager:
             return []
 
     def export_to_json(self, json_file):
-        """Экспорт всех данных в JSON файл для синхронизации."""
+        """Экспорт всех данных в JSON файл для синхронизации.
+
+        Записи пишутся в файл потоково, по мере чтения курсора, без сборки
+        всего архива в памяти; каждая запись занимает одну строку.
+        """
         try:
             logger.info(f"Экспорт данных в JSON: {json_file}")
-            elements = self.load_elements()
-            registry = self.load_registry()
-
-            data = {
-                "elements": elements,
-                "registry": registry,
-                "export_timestamp": str(uuid.uuid4()),
-                "version": "1.0"
-            }
-
-            with open(json_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            with self._read_snapshot(), open(json_file, "wb", buffering=_SYNC_BUFFER_SIZE) as f:
+                f.write(b'{\n  "elements": [')
+                elements_count = _write_json_array(
+                    f, map(self._element_from_row, self.conn.execute(_SQL_EXPORT_ELEMENTS))
+                )
+                f.write(b',\n  "registry": [')
+                registry_count = _write_json_array(
+                    f, map(self._registry_from_row, self.conn.execute(_SQL_EXPORT_REGISTRY))
+                )
+                f.write(b',\n  "export_timestamp": ' + _json_bytes(str(uuid.uuid4())))
+                f.write(b',\n  "version": "1.0"\n}\n')
 
-            logger.info(f"Экспорт завершен: {len(elements)} элементов, {len(registry)} записей реестра")
+            logger.info(f"Экспорт завершен: {elements_count} элементов, {registry_count} записей реестра")
             return True
         except Exception as e:
             logger.error(f"Ошибка экспорта в JSON: {e}")
             return False
 
+    @staticmethod
+    def _element_from_sync(el):
+        """Элемент из файла синхронизации в формате load_elements."""
+        return {
+            "ID": el["ID"],
+            "Название": el["Название"],
+            "Тип": el["Тип"],
+            "Родитель ID": el["Родитель ID"] or None,
+            "Стеллаж": el["Стеллаж"] or "",
+            "Полка": el["Полка"] or "",
+            "Номер документа": el["Номер документа"] or "",
+            "Дата подписания": el["Дата подписания"] or "",
+            "Категория": el["Категория"] or ""
+        }
+
+    @staticmethod
+    def _registry_sync_params(reg):
+        """Параметры _SQL_INSERT_REGISTRY для записи реестра из файла синхронизации."""
+        return (
+            reg["ID"],
+            reg["Название"],
+            reg["Тип"],
+            reg["Номер документа"] or None,
+            reg["Дата подписания"] or None,
+            reg["Статус"] or None,
+            reg["Категория"] or None
+        )
+
     def import_from_json(self, json_file):
         """Импорт данных из JSON файла с полной заменой."""
         try:
@@ -416,73 +852,146 @@ class DataManager:
                 logger.warning(f"JSON файл {json_file} не существует")
                 return False
 
-            with open(json_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            cursor = self.conn.cursor()
-
-            # Очищаем существующие данные
-            cursor.execute("DELETE FROM elements")
-            cursor.execute("DELETE FROM registry")
-
-            # Импортируем элементы
-            elements = data.get("elements", [])
-            for el in elements:
-                cursor.execute(
-                    "INSERT INTO elements (id, name, type, parent_id, shelf, rack, doc_number, sign_date, category) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                    (
-                        el["ID"],
-                        el["Название"],
-                        el["Тип"],
-                        el["Родитель ID"] or None,
-                        el["Стеллаж"] or None,
-                        el["Полка"] or None,
-                        el["Номер документа"] or None,
-                        el["Дата подписания"] or None,
-                        el["Категория"] or None
-                    )
-                )
+            imported = []
 
-            # Импортируем реестр
-            registry = data.get("registry", [])
-            for reg in registry:
-                cursor.execute(
-                    "INSERT INTO registry (id, name, type, doc_number, sign_date, status, category) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                    (
-                        reg["ID"],
-                        reg["Название"],
-                        reg["Тип"],
-                        reg["Номер документа"] or None,
-                        reg["Дата подписания"] or None,
-                        reg["Статус"] or None,
-                        reg["Категория"] or None
-                    )
+            def element_rows():
+                # Попутно собираем элементы в формате load_elements для кэша
+                for el in _iter_json_items(json_file, "elements"):
+                    element = self._element_from_sync(el)
+                    imported.append(element)
+                    yield self._element_params(element["ID"], element)
+
+            # Очистка и вставка выполняются одной транзакцией
+            self.flush_pending_writes()
+            with self.conn:
+                # Очищаем существующие данные
+                self._cur.execute("DELETE FROM elements")
+                self._cur.execute("DELETE FROM registry")
+                # Элементы в файле идут по ID, а не от родителей к детям - ссылки проверяются при фиксации
+                self._cur.execute("PRAGMA defer_foreign_keys = ON")
+
+                # Импортируем элементы
+                self._cur.executemany(_SQL_INSERT_ELEMENT, element_rows())
+                elements_count = self._cur.rowcount
+
+                # Импортируем реестр
+                self._cur.executemany(
+                    _SQL_INSERT_REGISTRY,
+                    map(self._registry_sync_params, _iter_json_items(json_file, "registry"))
                 )
+                registry_count = self._cur.rowcount
 
-            self.conn.commit()
-            self.elements = []
-            self._elements_loaded = False
-            logger.info(f"Импорт завершен: {len(elements)} элементов, {len(registry)} записей реестра")
+            # Кэш строится из уже прочитанных элементов, без повторной выборки из БД
+            self._set_cache(imported)
+            logger.info(f"Импорт завершен: {elements_count} элементов, {registry_count} записей реестра")
             return True
         except Exception as e:
             logger.error(f"Ошибка импорта из JSON: {e}")
             return False
 
+    def export_to_ndjson(self, ndjson_file):
+        """Экспорт всех данных в NDJSON файл для синхронизации.
+
+        Первая строка - заголовок с версией формата, далее по строке на запись:
+        {"table": "elements" | "registry", "row": {...}}. Изменение записи
+        меняет в git только её строку, а неизменённые данные дают побайтно
+        тот же файл (в заголовке нет случайных меток), так что git передаёт
+        только дельту. Для передачи не через git файл с расширением .zst
+        сжимается zstd.
+        """
+        try:
+            logger.info(f"Экспорт данных в NDJSON: {ndjson_file}")
+            counts = {}
+            with self._read_snapshot(), _open_sync_file(ndjson_file, "wb") as f:
+                f.write(_json_bytes({"version": _SYNC_FORMAT_VERSION}) + b"\n")
+                for table, query, from_row in (
+                        ("elements", _SQL_EXPORT_ELEMENTS, self._element_from_row),
+                        ("registry", _SQL_EXPORT_REGISTRY, self._registry_from_row),
+                ):
+                    counts[table] = 0
+                    for row in self.conn.execute(query):
+                        f.write(_json_bytes({"table": table, "row": from_row(row)}) + b"\n")
+                        counts[table] += 1
+
+            logger.info(f"Экспорт завершен: {counts['elements']} элементов, {counts['registry']} записей реестра")
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка экспорта в NDJSON: {e}")
+            return False
+
+    def import_from_ndjson(self, ndjson_file):
+        """Импорт данных из NDJSON файла (формат export_to_ndjson) с полной заменой.
+
+        Файл читается построчно; записи вставляются пачками по _IMPORT_BATCH_SIZE
+        в одной транзакции, блокировка записи берётся сразу (BEGIN IMMEDIATE).
+        """
+        try:
+            logger.info(f"Импорт данных из NDJSON: {ndjson_file}")
+            if not Path(ndjson_file).exists():
+                logger.warning(f"NDJSON файл {ndjson_file} не существует")
+                return False
+
+            loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+            imported = []
+            elements, registry = [], []
+            elements_count = registry_count = 0
+
+            self.flush_pending_writes()
+            with self.conn, _open_sync_file(ndjson_file, "rb") as f:
+                if not self.conn.in_transaction:
+                    self._cur.execute("BEGIN IMMEDIATE")
+                header = loads(f.readline())
+                if header.get("version") != _SYNC_FORMAT_VERSION:
+                    raise ValueError(f"неподдерживаемая версия формата: {header.get('version')}")
+
+                self._cur.execute("DELETE FROM elements")
+                self._cur.execute("DELETE FROM registry")
+                # Элементы в файле идут по ID, а не от родителей к детям - ссылки проверяются при фиксации
+                self._cur.execute("PRAGMA defer_foreign_keys = ON")
+
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = loads(line)
+                    if record["table"] == "elements":
+                        element = self._element_from_sync(record["row"])
+                        imported.append(element)
+                        elements.append(self._element_params(element["ID"], element))
+                        if len(elements) >= _IMPORT_BATCH_SIZE:
+                            self._cur.executemany(_SQL_INSERT_ELEMENT, elements)
+                            elements_count += len(elements)
+                            elements.clear()
+                    elif record["table"] == "registry":
+                        registry.append(self._registry_sync_params(record["row"]))
+                        if len(registry) >= _IMPORT_BATCH_SIZE:
+                            self._cur.executemany(_SQL_INSERT_REGISTRY, registry)
+                            registry_count += len(registry)
+                            registry.clear()
+
+                self._cur.executemany(_SQL_INSERT_ELEMENT, elements)
+                self._cur.executemany(_SQL_INSERT_REGISTRY, registry)
+                elements_count += len(elements)
+                registry_count += len(registry)
+
+            self._set_cache(imported)
+            logger.info(f"Импорт завершен: {elements_count} элементов, {registry_count} записей реестра")
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка импорта из NDJSON: {e}")
+            return False
+
     def migrate_from_json(self, json_file):
         try:
             logger.info(f"Миграция данных из JSON: {json_file}")
             if not Path(json_file).exists():
                 logger.warning(f"JSON файл {json_file} не существует")
                 return False
-            with open(json_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            cursor = self.conn.cursor()
-            for el in data:
-                el_id = str(uuid.uuid4())
-                cursor.execute(
-                    "INSERT INTO elements (id, name, type, parent_id, shelf, rack, doc_number, sign_date, category) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                    (
-                        el_id,
+            migrated = []
+
+            def element_rows():
+                for el in _iter_json_items(json_file):
+                    row = (
+                        str(uuid.uuid4()),
                         el["name"],
                         el["type"],
                         el.get("parent_id"),
@@ -492,10 +1001,19 @@ class DataManager:
                         el.get("sign_date", ""),
                         el.get("category", "")
                     )
-                )
-            self.conn.commit()
-            self.elements = []
-            self._elements_loaded = False
+                    migrated.append(row)
+                    yield row
+
+            self.flush_pending_writes()
+            with self.conn:
+                self._cur.executemany(_SQL_INSERT_ELEMENT, element_rows())
+            # Миграция дополняет таблицу: новые элементы добавляются в уже загруженный кэш
+            for row in migrated:
+                self._add_to_cache(row[0], dict(zip(
+                    ("Название", "Тип", "Родитель ID", "Стеллаж", "Полка",
+                     "Номер документа", "Дата подписания", "Категория"),
+                    row[1:]
+                )))
             logger.info(f"Миграция данных из {json_file} завершена")
             return True
         except Exception as e:
@@ -505,9 +1023,8 @@ class DataManager:
     def get_boxes(self):
         """Получить список всех коробок."""
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT id, name FROM elements WHERE type = 'Коробка' ORDER BY name")
-            boxes = [{"id": row[0], "name": row[1]} for row in cursor.fetchall()]
+            self._cur.execute(_SQL_SELECT_BOXES)
+            boxes = [{"id": row[0], "name": row[1]} for row in self._cur.fetchall()]
             return boxes
         except Exception as e:
             logger.error(f"Ошибка получения списка коробок: {e}")
@@ -516,33 +1033,18 @@ class DataManager:
     def get_documents_in_box(self, box_id):
         """Получить все документы в коробке (рекурсивно, включая документы в папках)."""
         try:
-            documents = []
-            cursor = self.conn.cursor()
-
-            # Рекурсивный поиск всех документов в коробке
-            def find_documents_recursive(parent_id):
-                # Найти все элементы с указанным родителем
-                cursor.execute("SELECT id, name, type, doc_number, sign_date, category FROM elements WHERE parent_id = ?", (parent_id,))
-                children = cursor.fetchall()
-
-                for child in children:
-                    child_id, name, el_type, doc_number, sign_date, category = child
-
-                    if el_type == "Документ":
-                        # Это документ - добавляем в список
-                        documents.append({
-                            "ID": child_id,
-                            "Название": name,
-                            "Номер документа": doc_number or "",
-                            "Дата подписания": sign_date or "",
-                            "Категория": category or ""
-                        })
-                    elif el_type in ["Папка", "Коробка"]:
-                        # Это папка или вложенная коробка - ищем документы внутри
-                        find_documents_recursive(child_id)
-
-            # Начинаем поиск с коробки
-            find_documents_recursive(box_id)
+            # Один рекурсивный запрос обходит все вложенные папки и коробки
+            self._cur.execute(_SQL_DOCUMENTS_IN_BOX, (box_id,))
+            documents = [
+                {
+                    "ID": row[0],
+                    "Название": row[1],
+                    "Номер документа": row[2],
+                    "Дата подписания": row[3],
+                    "Категория": row[4]
+                }
+                for row in self._cur.fetchall()
+            ]
 
             logger.info(f"Найдено {len(documents)} документов в коробке {box_id}")
             return documents
@@ -554,17 +1056,15 @@ class DataManager:
     def close(self):
         try:
             logger.info("Закрытие соединения с базой данных")
-            self.elements.clear()
-            self._elements_loaded = False
+            self.invalidate_cache()
             if self.conn:
                 self.conn.close()
             logger.info("Соединение с базой данных закрыто")
         except Exception as e:
             logger.error(f"Ошибка при закрытии соединения: {e}")
 
-    def __del__(self):
-        try:
-            if hasattr(self, 'conn') and self.conn:
-                self.conn.close()
-        except Exception:
-            pass
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
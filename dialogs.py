@@ -1,11 +1,11 @@
 import logging
 
-from PyQt6.QtCore import Qt, QDate, QPropertyAnimation, QEasingCurve
+from PyQt6.QtCore import Qt, QDate, QStringListModel, QPropertyAnimation, QParallelAnimationGroup, QEasingCurve, QTimer, pyqtSlot
 from PyQt6.QtGui import QFont
 from PyQt6.QtWidgets import (
     QDialog, QFormLayout, QPushButton, QLineEdit, QComboBox, QHBoxLayout,
     QTextEdit, QCompleter, QSizePolicy, QDateEdit, QCheckBox, QVBoxLayout, QMessageBox,
-    QGroupBox, QListWidget, QListWidgetItem, QLabel, QRadioButton, QButtonGroup
+    QGroupBox, QListWidget, QLabel, QRadioButton, QButtonGroup
 )
 
 from data_manager import get_category_description
@@ -13,11 +13,53 @@ from ui_theme import apply_global_style
 
 logger = logging.getLogger(__name__)
 
+_ARIAL_12 = None
+
+# Коды категорий, доступные для выбора в диалоге
+_CATEGORIES = ("ТС", "ВО", "ВС", "ЛК", "УУТЭ", "УУХВС")
+_CATEGORY_DESCRIPTIONS = None
+
+_TYPES = ("Документ", "Коробка", "Папка", "Другое")
+_DEFAULT_SHELVES = ("Без стеллажа",)
+
+# Раскладки листа наклеек: подпись и размер сетки (столбцы, строки)
+_LAYOUT_ITEMS = (
+    ("4x6 (24 наклейки)", (4, 6)),
+    ("5x7 (35 наклеек)", (5, 7)),
+    ("6x8 (48 наклеек)", (6, 8)),
+    ("7x9 (63 наклейки)", (7, 9)),
+    ("8x10 (80 наклеек)", (8, 10)),
+    ("3x4 (12 наклеек)", (3, 4)),
+    ("2x3 (6 наклеек)", (2, 3)),
+)
+
+
+def _arial_12():
+    """Общий шрифт полей диалога (создаётся один раз, после запуска QApplication)."""
+    global _ARIAL_12
+    if _ARIAL_12 is None:
+        _ARIAL_12 = QFont("Arial", 12)
+    return _ARIAL_12
+
+
+def _category_descriptions():
+    """Описания категорий диалога (вычисляются при первом открытии)."""
+    global _CATEGORY_DESCRIPTIONS
+    if _CATEGORY_DESCRIPTIONS is None:
+        _CATEGORY_DESCRIPTIONS = {cat: get_category_description(cat) for cat in _CATEGORIES}
+    return _CATEGORY_DESCRIPTIONS
+
 
 class AutoResizingTextEdit(QTextEdit):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.textChanged.connect(self.adjustHeight)
+        # Пересчёт высоты требует полной раскладки документа, поэтому
+        # при наборе текста он выполняется один раз после серии изменений
+        self._resize_timer = QTimer(self)
+        self._resize_timer.setSingleShot(True)
+        self._resize_timer.setInterval(30)
+        self._resize_timer.timeout.connect(self.adjustHeight)
+        self.textChanged.connect(self._resize_timer.start)
         self.setFixedHeight(60)
         self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Minimum)
 
@@ -27,6 +69,8 @@ class AutoResizingTextEdit(QTextEdit):
             min_height = 60
             max_height = 500
             new_height = max(min_height, min(doc_height, max_height))
+            if new_height == self.height():
+                return
             self.setFixedHeight(new_height)
         except Exception as e:
             logger.error(f"Ошибка при настройке высоты AutoResizingTextEdit: {e}")
@@ -40,20 +84,25 @@ class AddEditDialog(QDialog):
         self.setWindowTitle("Редактировать элемент" if element else "Добавить элемент")
         self.setMinimumWidth(800)
         self.new_element_id = None
+        self._parent_name_to_id = {}
+        self._cached_name = None
+        # Пока диалог собирается, поля стеллажа и полки переключаются без анимации
+        self._suppress_animation = True
+        self._field_anim_group = None
         try:
             logger.info("Начало инициализации AddEditDialog")
             apply_global_style(self)
             self.form_layout = QFormLayout()
             self.form_layout.setSpacing(12)
             self.name_input = AutoResizingTextEdit()
-            self.name_input.setFont(QFont("Arial", 12))
+            self.name_input.setFont(_arial_12())
             if element:
                 self.name_input.setPlainText(element["Название"])
             self.name_input.setToolTip("Введите название элемента (обязательно)")
             self.form_layout.addRow("Название:", self.name_input)
             self.type_input = QComboBox()
-            self.type_input.setFont(QFont("Arial", 12))
-            self.type_input.addItems(["Документ", "Коробка", "Папка", "Другое"])
+            self.type_input.setFont(_arial_12())
+            self.type_input.addItems(_TYPES)
             if element:
                 idx = self.type_input.findText(element["Тип"])
                 self.type_input.setCurrentIndex(idx if idx >= 0 else 0)
@@ -61,7 +110,10 @@ class AddEditDialog(QDialog):
             self.form_layout.addRow("Тип:", self.type_input)
             self.parent_input = QComboBox()
             self.parent_input.setEditable(True)
-            self.parent_input.setFont(QFont("Arial", 12))
+            self.parent_input.setFont(_arial_12())
+            self._parent_completer = QCompleter(self)
+            self._parent_completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+            self.parent_input.setCompleter(self._parent_completer)
             self.parent_input.addItem("")
             self.update_parent_choices()
             if element and element.get("Родитель ID"):
@@ -74,41 +126,41 @@ class AddEditDialog(QDialog):
             parent_layout.addWidget(self.clear_parent_btn)
             self.form_layout.addRow("Родитель:", parent_layout)
             self.shelf_input = QComboBox()
-            self.shelf_input.setFont(QFont("Arial", 12))
-            self.shelf_input.addItems(self.manager.shelves or ["Без стеллажа"])
+            self.shelf_input.setFont(_arial_12())
+            self.shelf_input.addItems(self.manager.shelves or _DEFAULT_SHELVES)
             if element:
                 idx = self.shelf_input.findText(element["Стеллаж"])
                 self.shelf_input.setCurrentIndex(idx if idx >= 0 else 0)
             self.shelf_input.setToolTip("Выберите стеллаж")
             self.shelf_row = self.form_layout.addRow("Стеллаж:", self.shelf_input)
             self.rack_input = QLineEdit()
-            self.rack_input.setFont(QFont("Arial", 12))
+            self.rack_input.setFont(_arial_12())
             if element:
                 self.rack_input.setText(element["Полка"])
             self.rack_input.setToolTip("Введите номер полки (только цифры)")
             self.rack_row = self.form_layout.addRow("Полка:", self.rack_input)
             self.doc_number_input = QLineEdit()
-            self.doc_number_input.setFont(QFont("Arial", 12))
+            self.doc_number_input.setFont(_arial_12())
             if element:
                 self.doc_number_input.setText(element.get("Номер документа", ""))
             self.doc_number_input.setToolTip("Введите номер документа (только для типа Документ)")
             self.form_layout.addRow("Номер документа:", self.doc_number_input)
             self.date_layout = QVBoxLayout()
             self.no_date_checkbox = QCheckBox("Без даты")
-            self.no_date_checkbox.setFont(QFont("Arial", 12))
+            self.no_date_checkbox.setFont(_arial_12())
             self.date_layout.addWidget(self.no_date_checkbox)
             self.year_only_checkbox = QCheckBox("Только год")
-            self.year_only_checkbox.setFont(QFont("Arial", 12))
+            self.year_only_checkbox.setFont(_arial_12())
             self.date_layout.addWidget(self.year_only_checkbox)
             self.sign_date_input = QDateEdit()
-            self.sign_date_input.setFont(QFont("Arial", 12))
+            self.sign_date_input.setFont(_arial_12())
             self.sign_date_input.setCalendarPopup(True)
             self.sign_date_input.setDisplayFormat("dd.MM.yyyy")
             self.sign_date_input.setDate(QDate.currentDate())
             self.sign_date_input.setToolTip("Выберите дату подписания документа (только для типа Документ)")
             self.date_layout.addWidget(self.sign_date_input)
             self.year_input = QLineEdit()
-            self.year_input.setFont(QFont("Arial", 12))
+            self.year_input.setFont(_arial_12())
             self.year_input.setPlaceholderText("Год (например, 2023)")
             self.year_input.setToolTip("Введите год подписания документа (например, 2023)")
             self.date_layout.addWidget(self.year_input)
@@ -118,23 +170,17 @@ class AddEditDialog(QDialog):
             self.category_group = QGroupBox("Категории (можно выбрать несколько)")
             category_layout = QVBoxLayout()
             self.category_checkboxes = {}
-            categories = [
-                "ТС", "ВО", "ВС", "ЛК", "УУТЭ", "УУХВС"
-            ]  # Коды категорий из вашего списка
-            for cat in categories:
-                full_desc = get_category_description(cat)
+            for cat, full_desc in _category_descriptions().items():
                 cb = QCheckBox(full_desc)
-                cb.setFont(QFont("Arial", 12))
+                cb.setFont(_arial_12())
                 cb.setToolTip(f"Выберите категорию: {full_desc}")
                 category_layout.addWidget(cb)
                 self.category_checkboxes[cat] = cb
 
             if element:
-                selected_cats = element.get("Категория", "").split(",")
-                for cat in selected_cats:
-                    cat = cat.strip()
-                    if cat in self.category_checkboxes:
-                        self.category_checkboxes[cat].setChecked(True)
+                selected_set = {c.strip() for c in element.get("Категория", "").split(",") if c.strip()}
+                for cat, cb in self.category_checkboxes.items():
+                    cb.setChecked(cat in selected_set)
 
             self.category_group.setLayout(category_layout)
             self.form_layout.addRow("Категории:", self.category_group)
@@ -147,10 +193,15 @@ class AddEditDialog(QDialog):
                     self.year_only_checkbox.setChecked(True)
                     self.year_input.setText(sign_date)
                 else:
-                    try:
+                    # QDate.fromString не бросает исключений, а возвращает невалидную дату;
+                    # строки явно не того формата отсекаются без вызова парсера
+                    parsed = False
+                    if len(sign_date) == 10 and sign_date[2] == '.' and sign_date[5] == '.':
                         date = QDate.fromString(sign_date, "dd.MM.yyyy")
-                        self.sign_date_input.setDate(date)
-                    except:
+                        if date.isValid():
+                            self.sign_date_input.setDate(date)
+                            parsed = True
+                    if not parsed:
                         self.no_date_checkbox.setChecked(True)
             else:
                 self.no_date_checkbox.setChecked(True)
@@ -161,21 +212,38 @@ class AddEditDialog(QDialog):
             btn_layout.addWidget(self.save_btn)
             btn_layout.addWidget(cancel_btn)
             self.form_layout.addRow(btn_layout)
+            # Сигналы подключаются только после заполнения полей, чтобы начальные
+            # setPlainText/setChecked не запускали обработчики на полусобранной форме
             self.type_input.currentTextChanged.connect(self.toggle_doc_fields)
+            # Допустимые родители зависят от типа - список и индекс имён пересобираются
+            self.type_input.currentTextChanged.connect(self._on_type_changed)
             self.no_date_checkbox.toggled.connect(self.toggle_date_fields)
             self.year_only_checkbox.toggled.connect(self.toggle_date_fields)
-            self.parent_input.currentTextChanged.connect(
-                lambda: self.update_field_availability(self.parent_input.currentText()))
-            self.name_input.textChanged.connect(self.validate_inputs)
-            self.type_input.currentTextChanged.connect(self.validate_inputs)
-            self.rack_input.textChanged.connect(self.validate_inputs)
-            self.year_input.textChanged.connect(self.validate_inputs)
-            self.clear_parent_btn.clicked.connect(lambda: self.parent_input.setCurrentText(""))
+            # Поле родителя редактируемое: сигнал приходит на каждый символ,
+            # поэтому пересчёт доступности полей откладывается до паузы ввода
+            self._parent_change_timer = QTimer(self)
+            self._parent_change_timer.setSingleShot(True)
+            self._parent_change_timer.setInterval(150)
+            self._parent_change_timer.timeout.connect(self._apply_parent_change)
+            self.parent_input.currentTextChanged.connect(self._on_parent_changed)
+            # Несколько сигналов подряд (ввод, переключение типа, пересчёт полей)
+            # схлопываются в одну проверку на следующей итерации цикла событий
+            self._validate_timer = QTimer(self)
+            self._validate_timer.setSingleShot(True)
+            self._validate_timer.setInterval(0)
+            self._validate_timer.timeout.connect(self.validate_inputs)
+            self.name_input.textChanged.connect(self._on_name_changed)
+            self.type_input.currentTextChanged.connect(self._schedule_validate)
+            self.rack_input.textChanged.connect(self._schedule_validate)
+            self.year_input.textChanged.connect(self._schedule_validate)
+            self.clear_parent_btn.clicked.connect(self._on_clear_parent)
             self.save_btn.clicked.connect(self.save)
             cancel_btn.clicked.connect(self.reject)
             self.toggle_doc_fields(self.type_input.currentText())
             self.update_field_availability(self.parent_input.currentText())
+            # Проверка выполняется сразу; отложенная из обработчиков выше уже не нужна
             self.validate_inputs()
+            self._validate_timer.stop()
             logger.info("Инициализация AddEditDialog завершена")
 
             # Новое: Установить layout на диалог (было забыто в оригинале, но теперь добавлено явно)
@@ -183,146 +251,191 @@ class AddEditDialog(QDialog):
         except Exception as e:
             logger.error(f"Ошибка инициализации AddEditDialog: {e}")
             QMessageBox.critical(self, "Ошибка", f"Не удалось инициализировать диалог: {str(e)}")
+        self._suppress_animation = False
 
     def update_parent_choices(self):
         try:
             containers = self.manager.get_containers(self.type_input.currentText())
-            self.parent_input.clear()
-            self.parent_input.addItem("")
+            own_id = self.element.get("ID") if self.element else None
+            names = [""]
+            # Индекс "отображаемое имя -> ID" для поиска родителя при сохранении
+            # (при совпадении имён побеждает первый контейнер, как и в списке)
+            self._parent_name_to_id = {}
             for el in containers:
-                if not self.element or el["ID"] != self.element.get("ID"):
-                    self.parent_input.addItem(f"{el['Тип']}: {el['Название']}")
-            completer = QCompleter([self.parent_input.itemText(i) for i in range(self.parent_input.count())])
-            completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-            self.parent_input.setCompleter(completer)
+                if el["ID"] != own_id:
+                    name = f"{el['Тип']}: {el['Название']}"
+                    names.append(name)
+                    self._parent_name_to_id.setdefault(name, el["ID"])
+            self.parent_input.clear()
+            self.parent_input.addItems(names)
+            self._parent_completer.setModel(QStringListModel(names, self._parent_completer))
         except Exception as e:
             logger.error(f"Ошибка в update_parent_choices: {e}")
 
-    def get_parent_display_name(self, parent_id):
-        try:
-            parent = self.manager.find_by_id(parent_id)
-            if parent:
-                return f"{parent['Тип']}: {parent['Название']}"
-            return ""
-        except Exception as e:
-            logger.error(f"Ошибка в get_parent_display_name: {e}")
-            return ""
+    @pyqtSlot(str)
+    def _on_type_changed(self, el_type):
+        """Пересборка списка родителей под новый тип с сохранением введённого текста.
 
-    def validate_inputs(self):
-        try:
-            is_valid = bool(self.name_input.toPlainText().strip())
-            if self.type_input.currentText() == "Документ":
-                if self.year_only_checkbox.isChecked():
-                    year = self.year_input.text().strip()
-                    is_valid = is_valid and (year.isdigit() and len(year) == 4 or not year)
-            self.save_btn.setEnabled(is_valid)
-        except Exception as e:
-            logger.error(f"Ошибка в validate_inputs: {e}")
+        Родитель, недопустимый для нового типа, остаётся в поле, но отсутствует
+        в _parent_name_to_id - save() отклонит его.
+        """
+        parent_text = self.parent_input.currentText()
+        self.update_parent_choices()
+        self.parent_input.setCurrentText(parent_text)
 
+    def get_parent_display_name(self, parent_id):
+        parent = self.manager.find_by_id(parent_id)
+        if parent:
+            return f"{parent['Тип']}: {parent['Название']}"
+        return ""
+
+    def _name_text(self):
+        """Название без пробелов по краям (кэшируется до следующего изменения текста)."""
+        if self._cached_name is None:
+            self._cached_name = self.name_input.toPlainText().strip()
+        return self._cached_name
+
+    @pyqtSlot()
+    def _on_name_changed(self):
+        self._cached_name = None
+        self._schedule_validate()
+
+    @pyqtSlot()
+    def _schedule_validate(self):
+        self._validate_timer.start()
+
+    @pyqtSlot()
+    def _on_parent_changed(self):
+        self._parent_change_timer.start()
+
+    @pyqtSlot()
+    def _apply_parent_change(self):
+        self.update_field_availability(self.parent_input.currentText())
+
+    @pyqtSlot()
+    def _on_clear_parent(self):
+        self.parent_input.setCurrentText("")
+
+    @pyqtSlot()
+    def validate_inputs(self):
+        is_valid = bool(self._name_text())
+        if self.type_input.currentText() == "Документ":
+            if self.year_only_checkbox.isChecked():
+                year = self.year_input.text().strip()
+                is_valid = is_valid and (year.isdigit() and len(year) == 4 or not year)
+        self.save_btn.setEnabled(is_valid)
+
+    @pyqtSlot(str)
     def update_field_availability(self, parent_text):
-        try:
-            has_parent = bool(parent_text.strip())
-            self.shelf_input.setEnabled(not has_parent)
-            self.rack_input.setEnabled(not has_parent)
-            if has_parent:
-                self.shelf_input.setCurrentText("Без стеллажа")
-                self.rack_input.clear()
-                self.animate_field_visibility(False)
-            else:
-                self.animate_field_visibility(True)
-            self.validate_inputs()
-        except Exception as e:
-            logger.error(f"Ошибка в update_field_availability: {e}")
+        has_parent = bool(parent_text.strip())
+        self.shelf_input.setEnabled(not has_parent)
+        self.rack_input.setEnabled(not has_parent)
+        if has_parent:
+            self.shelf_input.setCurrentText("Без стеллажа")
+            self.rack_input.clear()
+        self.animate_field_visibility(not has_parent)
+        self._schedule_validate()
+
+    def _set_location_fields_visible(self, visible):
+        """Показать или скрыть поля стеллажа и полки без анимации."""
+        for field in (self.shelf_input, self.rack_input):
+            field.setMaximumHeight(40 if visible else 0)
+            field.setVisible(visible)
+            label = self.form_layout.labelForField(field)
+            if label:
+                label.setVisible(visible)
 
     def animate_field_visibility(self, visible):
-        try:
-            target_height = 0 if not visible else 40
-            if not hasattr(self, 'shelf_animation'):
-                self.shelf_animation = QPropertyAnimation(self.shelf_input, b"maximumHeight")
-                self.shelf_animation.setDuration(300)
-                self.shelf_animation.setEasingCurve(QEasingCurve.Type.InOutQuad)
-            self.shelf_animation.setStartValue(self.shelf_input.maximumHeight())
-            self.shelf_animation.setEndValue(target_height)
-            self.shelf_animation.start()
-            if not hasattr(self, 'rack_animation'):
-                self.rack_animation = QPropertyAnimation(self.rack_input, b"maximumHeight")
-                self.rack_animation.setDuration(300)
-                self.rack_animation.setEasingCurve(QEasingCurve.Type.InOutQuad)
-            self.rack_animation.setStartValue(self.rack_input.maximumHeight())
-            self.rack_animation.setEndValue(target_height)
-            self.rack_animation.start()
-            shelf_label = self.form_layout.labelForField(self.shelf_input)
-            rack_label = self.form_layout.labelForField(self.rack_input)
-            if shelf_label:
-                shelf_label.setVisible(visible)
-            if rack_label:
-                rack_label.setVisible(visible)
-        except Exception as e:
-            logger.error(f"Ошибка в animate_field_visibility: {e}")
-
+        if self._suppress_animation:
+            # Начальное состояние задаётся сразу, объекты анимации не создаются
+            self._set_location_fields_visible(visible)
+            return
+        target_height = 0 if not visible else 40
+        if self.shelf_input.maximumHeight() == target_height:
+            return
+        if visible:
+            self.shelf_input.setVisible(True)
+            self.rack_input.setVisible(True)
+        if self._field_anim_group is None:
+            # Оба поля анимируются на одной временной шкале
+            self._field_anim_group = QParallelAnimationGroup(self)
+            for field in (self.shelf_input, self.rack_input):
+                animation = QPropertyAnimation(field, b"maximumHeight")
+                animation.setDuration(300)
+                animation.setEasingCurve(QEasingCurve.Type.InOutQuad)
+                self._field_anim_group.addAnimation(animation)
+        self._field_anim_group.stop()
+        for i, field in enumerate((self.shelf_input, self.rack_input)):
+            animation = self._field_anim_group.animationAt(i)
+            animation.setStartValue(field.maximumHeight())
+            animation.setEndValue(target_height)
+        self._field_anim_group.start()
+        shelf_label = self.form_layout.labelForField(self.shelf_input)
+        rack_label = self.form_layout.labelForField(self.rack_input)
+        if shelf_label:
+            shelf_label.setVisible(visible)
+        if rack_label:
+            rack_label.setVisible(visible)
+
+    @pyqtSlot(str)
     def toggle_doc_fields(self, el_type):
-        try:
-            is_doc = el_type == "Документ"
-            self.doc_number_input.setEnabled(is_doc)
-            self.no_date_checkbox.setEnabled(is_doc)
-            self.year_only_checkbox.setEnabled(is_doc)
-            self.sign_date_input.setEnabled(
-                is_doc and not self.no_date_checkbox.isChecked() and not self.year_only_checkbox.isChecked())
-            self.year_input.setEnabled(is_doc and self.year_only_checkbox.isChecked())
-            self.validate_inputs()
-        except Exception as e:
-            logger.error(f"Ошибка в toggle_doc_fields: {e}")
-
+        is_doc = el_type == "Документ"
+        self.doc_number_input.setEnabled(is_doc)
+        self.no_date_checkbox.setEnabled(is_doc)
+        self.year_only_checkbox.setEnabled(is_doc)
+        self.sign_date_input.setEnabled(
+            is_doc and not self.no_date_checkbox.isChecked() and not self.year_only_checkbox.isChecked())
+        self.year_input.setEnabled(is_doc and self.year_only_checkbox.isChecked())
+        self._schedule_validate()
+
+    @pyqtSlot()
     def toggle_date_fields(self):
-        try:
-            self.sign_date_input.setEnabled(
-                not self.no_date_checkbox.isChecked() and not self.year_only_checkbox.isChecked())
-            self.year_input.setEnabled(self.year_only_checkbox.isChecked())
-            self.validate_inputs()
-        except Exception as e:
-            logger.error(f"Ошибка в toggle_date_fields: {e}")
+        self.sign_date_input.setEnabled(
+            not self.no_date_checkbox.isChecked() and not self.year_only_checkbox.isChecked())
+        self.year_input.setEnabled(self.year_only_checkbox.isChecked())
+        self._schedule_validate()
 
-    def get_element_data(self):
-        parent_text = self.parent_input.currentText().strip()
-        parent_id = None
-        if parent_text:
-            containers = self.manager.get_containers(self.type_input.currentText())
-            for el in containers:
-                if f"{el['Тип']}: {el['Название']}" == parent_text:
-                    parent_id = el["ID"]
-                    break
-        # Изменение: Собираем выбранные категории как строку с запятыми
-        selected_categories = [cat for cat, cb in self.category_checkboxes.items() if cb.isChecked()]
-        category = ",".join(selected_categories) if selected_categories else ""
+    def _build_element_dict(self, el_type, parent_id, shelf, rack, sign_date):
+        """Собрать данные элемента из полей формы с уже вычисленными типом, родителем, местом и датой."""
         return {
-            "Название": self.name_input.toPlainText().strip(),
-            "Тип": self.type_input.currentText(),
+            "Название": self._name_text(),
+            "Тип": el_type,
             "Родитель ID": parent_id,
-            "Стеллаж": self.shelf_input.currentText() if not parent_text else "",
-            "Полка": self.rack_input.text().strip() if not parent_text else "",
-            "Номер документа": self.doc_number_input.text().strip() if self.type_input.currentText() == "Документ" else "",
-            "Дата подписания": (
-                "" if self.no_date_checkbox.isChecked() else
-                self.year_input.text().strip() if self.year_only_checkbox.isChecked() else
-                self.sign_date_input.date().toString("dd.MM.yyyy")
-            ),
-            "Категория": category
+            "Стеллаж": shelf,
+            "Полка": rack,
+            "Номер документа": self.doc_number_input.text().strip() if el_type == "Документ" else "",
+            "Дата подписания": sign_date,
+            # Выбранные категории хранятся строкой через запятую
+            "Категория": ",".join(cat for cat, cb in self.category_checkboxes.items() if cb.isChecked())
         }
 
+    def get_element_data(self):
+        parent_text = self.parent_input.currentText().strip()
+        parent_id = self._parent_name_to_id.get(parent_text) if parent_text else None
+        sign_date = (
+            "" if self.no_date_checkbox.isChecked() else
+            self.year_input.text().strip() if self.year_only_checkbox.isChecked() else
+            self.sign_date_input.date().toString("dd.MM.yyyy")
+        )
+        return self._build_element_dict(
+            self.type_input.currentText(),
+            parent_id,
+            self.shelf_input.currentText() if not parent_text else "",
+            self.rack_input.text().strip() if not parent_text else "",
+            sign_date
+        )
+
+    @pyqtSlot()
     def save(self):
         try:
-            name = self.name_input.toPlainText().strip()
+            name = self._name_text()
             if not name:
                 QMessageBox.warning(self, "Ошибка", "Название обязательно")
                 return
             parent_text = self.parent_input.currentText().strip()
             parent_id = None
             if parent_text:
-                containers = self.manager.get_containers(self.type_input.currentText())
-                for el in containers:
-                    if f"{el['Тип']}: {el['Название']}" == parent_text:
-                        parent_id = el["ID"]
-                        break
+                parent_id = self._parent_name_to_id.get(parent_text)
                 if not parent_id:
                     QMessageBox.warning(self, "Ошибка", "Недопустимый родительский элемент")
                     return
@@ -337,12 +450,15 @@ class AddEditDialog(QDialog):
             shelf = ""
             if not parent_id:
                 rack = self.rack_input.text().strip()
-                shelf = self.shelf_input.currentText() if self.shelf_input.currentText() != "Без стеллажа" else ""
+                shelf = self.shelf_input.currentText()
+                if shelf == "Без стеллажа":
+                    shelf = ""
                 if rack and not rack.isdigit():
                     QMessageBox.warning(self, "Ошибка", "Номер полки должен быть числом")
                     return
+            el_type = self.type_input.currentText()
             sign_date = ""
-            if self.type_input.currentText() == "Документ":
+            if el_type == "Документ":
                 if self.no_date_checkbox.isChecked():
                     sign_date = ""
                 elif self.year_only_checkbox.isChecked():
@@ -353,16 +469,7 @@ class AddEditDialog(QDialog):
                     sign_date = year
                 else:
                     sign_date = self.sign_date_input.date().toString("dd.MM.yyyy")
-            element = {
-                "Название": name,
-                "Тип": self.type_input.currentText(),
-                "Родитель ID": parent_id,
-                "Стеллаж": shelf,
-                "Полка": rack,
-                "Номер документа": self.doc_number_input.text().strip() if self.type_input.currentText() == "Документ" else "",
-                "Дата подписания": sign_date,
-                "Категория": self.get_element_data()["Категория"]  # Здесь берётся строка с запятыми
-            }
+            element = self._build_element_dict(el_type, parent_id, shelf, rack, sign_date)
             if self.element:
                 self.manager.edit_element(self.element["ID"], element)
             else:
@@ -382,6 +489,7 @@ class PrintLabelsDialog(QDialog):
     def __init__(self, boxes_data, parent=None):
         super().__init__(parent)
         self.boxes_data = boxes_data  # Список словарей с данными коробок
+        self._box_by_id = {b['ID']: b for b in boxes_data}
         self.selected_boxes = []
         self.setWindowTitle("Печать наклеек на коробки")
         self.setMinimumWidth(600)
@@ -447,15 +555,9 @@ class PrintLabelsDialog(QDialog):
         layout_layout = QVBoxLayout()
 
         self.layout_combo = QComboBox()
-        self.layout_combo.addItems([
-            "4x6 (24 наклейки)",
-            "5x7 (35 наклеек)",
-            "6x8 (48 наклеек)",
-            "7x9 (63 наклейки)",
-            "8x10 (80 наклеек)",
-            "3x4 (12 наклеек)",
-            "2x3 (6 наклеек)"
-        ])
+        # Размеры сетки хранятся в данных элемента
+        for label, dims in _LAYOUT_ITEMS:
+            self.layout_combo.addItem(label, dims)
         self.layout_combo.setCurrentText("6x8 (48 наклеек)")
         layout_layout.addWidget(QLabel("Количество наклеек на листе:"))
         layout_layout.addWidget(self.layout_combo)
@@ -479,10 +581,8 @@ class PrintLabelsDialog(QDialog):
 
         self.boxes_list = QListWidget()
         self.boxes_list.setEnabled(False)
-        for box in self.boxes_data:
-            item = QListWidgetItem(f"{box['Название']} - {box.get('Стеллаж', '')}/{box.get('Полка', '')}")
-            item.setData(Qt.ItemDataRole.UserRole, box['ID'])
-            self.boxes_list.addItem(item)
+        # Элементы списка создаются только при первом переходе в ручной выбор
+        self._list_populated = False
 
         boxes_layout.addWidget(QLabel("Доступные коробки:"))
         boxes_layout.addWidget(self.boxes_list)
@@ -490,6 +590,7 @@ class PrintLabelsDialog(QDialog):
         layout.addWidget(boxes_group)
 
         # Подключение сигналов для списка
+        self.select_manual.toggled.connect(self._ensure_boxes_list_populated)
         self.select_manual.toggled.connect(self.boxes_list.setEnabled)
 
         # Кнопки
@@ -509,6 +610,25 @@ class PrintLabelsDialog(QDialog):
         hint_label.setStyleSheet("color: #666; font-style: italic;")
         layout.addWidget(hint_label)
 
+    @pyqtSlot(bool)
+    def _ensure_boxes_list_populated(self, checked=True):
+        """Заполнить список коробок при первом включении ручного выбора."""
+        if not checked or self._list_populated:
+            return
+        self.boxes_list.setUpdatesEnabled(False)
+        self.boxes_list.blockSignals(True)
+        try:
+            # Подписи добавляются одним вызовом addItems, ID проставляются следом
+            start = self.boxes_list.count()
+            self.boxes_list.addItems(
+                [f"{box['Название']} - {box.get('Стеллаж', '')}/{box.get('Полка', '')}" for box in self.boxes_data])
+            for row, box in enumerate(self.boxes_data, start):
+                self.boxes_list.item(row).setData(Qt.ItemDataRole.UserRole, box['ID'])
+            self._list_populated = True
+        finally:
+            self.boxes_list.blockSignals(False)
+            self.boxes_list.setUpdatesEnabled(True)
+
     def get_print_settings(self):
         """Получить настройки печати."""
         # Определение формата
@@ -520,32 +640,17 @@ class PrintLabelsDialog(QDialog):
             format_type = "custom"
 
         # Получение раскладки
-        layout_text = self.layout_combo.currentText()
-        if "4x6" in layout_text:
-            cols, rows = 4, 6
-        elif "5x7" in layout_text:
-            cols, rows = 5, 7
-        elif "6x8" in layout_text:
-            cols, rows = 6, 8
-        elif "7x9" in layout_text:
-            cols, rows = 7, 9
-        elif "8x10" in layout_text:
-            cols, rows = 8, 10
-        elif "3x4" in layout_text:
-            cols, rows = 3, 4
-        elif "2x3" in layout_text:
-            cols, rows = 2, 3
-        else:  # по умолчанию
-            cols, rows = 6, 8
+        cols, rows = self.layout_combo.currentData() or (6, 8)  # по умолчанию 6x8
 
         # Выбор коробок
         if self.select_all.isChecked():
             selected_boxes = self.boxes_data
         else:
+            self._ensure_boxes_list_populated()
             selected_boxes = []
             for item in self.boxes_list.selectedItems():
                 box_id = item.data(Qt.ItemDataRole.UserRole)
-                box = next((b for b in self.boxes_data if b['ID'] == box_id), None)
+                box = self._box_by_id.get(box_id)
                 if box:
                     selected_boxes.append(box)
 
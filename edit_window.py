@@ -1,29 +1,61 @@
+import functools
 import logging
 import os
 import weakref
 
-import psutil
 from PyQt6.QtCore import Qt, QItemSelectionModel, QSortFilterProxyModel, QSettings, QPropertyAnimation, \
-    QEasingCurve
-from PyQt6.QtGui import QAction, QStandardItem, QStandardItemModel
+    QEasingCurve, QTimer, QAbstractListModel, QModelIndex, QEvent, QRect, QSize, QObject, QRunnable, QThreadPool, \
+    pyqtSignal, pyqtSlot
+from PyQt6.QtGui import QAction, QStandardItem, QStandardItemModel, QColor, QPalette
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QPushButton, QTableView, QSplitter,
     QTreeView, QMessageBox, QMenu, QAbstractItemView, QHeaderView,
     QHBoxLayout, QLineEdit, QDialog, QLabel,
-    QListWidget, QListWidgetItem, QCheckBox
+    QListView, QStyledItemDelegate, QStyle, QStyleOptionButton, QStyleOptionViewItem, QApplication
 )
 
 from data_manager import DataManager, get_category_description
 from dialogs import AddEditDialog
 from models import ElementsTableModel
-from ui_theme import AnimatedButton, apply_global_style
+from ui_theme import AnimatedButton
 
 logger = logging.getLogger(__name__)
 
+_CATEGORY_ICONS = {
+    "ТС": "🔥",
+    "ВО": "🚽",
+    "ВС": "💧",
+    "ЛК": "🌧",
+    "УУТЭ": "📏",
+    "УУХВС": "🚰"
+}
+_TYPE_ICONS = {
+    "Документ": "📄",
+    "Коробка": "📦",
+    "Папка": "📁",
+    "Другое": "🗂"
+}
+
+# Стиль кнопок панели инструментов: задаётся один раз на контейнер, кнопки наследуют его
+TOOLBAR_BTN_QSS = """
+    QPushButton {
+        background-color: white;
+        border-radius: 8px;
+        padding: 6px 12px;
+        font-weight: bold;
+        color: #1976D2;
+    }
+    QPushButton:hover {
+        background-color: #BBDEFB;
+    }
+"""
+
 
 def log_memory_usage():
     """Логирование использования памяти."""
     try:
+        # psutil нужен только здесь - не импортируем его при загрузке модуля
+        import psutil
         process = psutil.Process(os.getpid())
         mem_info = process.memory_info()
         logger.info(f"Использование памяти: {mem_info.rss / 1024 / 1024:.2f} MB")
@@ -31,6 +63,207 @@ def log_memory_usage():
         logger.warning(f"Не удалось получить данные о памяти: {e}")
 
 
+def ui_exceptions(message, show=True):
+    """Декоратор обработчиков окна: ошибка логируется и (при show=True) показывается пользователю.
+
+    Обёртка передаёт аргументы как есть; обработчики, подключаемые к сигналам,
+    дополнительно помечаются @pyqtSlot с нужной сигнатурой, чтобы Qt не передавал
+    лишние аргументы сигнала (checked, index).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return func(self, *args, **kwargs)
+            except Exception as e:
+                logger.error(f"{message}: {e}")
+                if show:
+                    QMessageBox.critical(self, "Ошибка", str(e))
+        return wrapper
+    return decorator
+
+
+class RegistryListModel(QAbstractListModel):
+    """Модель списка документов реестра с отметками для импорта."""
+
+    TITLE_ROLE = Qt.ItemDataRole.UserRole + 1
+    INFO_ROLE = Qt.ItemDataRole.UserRole + 2
+
+    def __init__(self, registry_elements, parent=None):
+        super().__init__(parent)
+        self._elements = registry_elements
+        self._checked = [True] * len(registry_elements)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._elements)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._elements):
+            return None
+        reg_el = self._elements[index.row()]
+        if role == Qt.ItemDataRole.UserRole:
+            return reg_el
+        if role == Qt.ItemDataRole.CheckStateRole:
+            return Qt.CheckState.Checked if self._checked[index.row()] else Qt.CheckState.Unchecked
+        if role in (Qt.ItemDataRole.DisplayRole, self.TITLE_ROLE):
+            category_icon = ImportFromRegistryDialog._get_category_icon(reg_el.get('Категория', ''))
+            return f"{category_icon} {reg_el['Название']}"
+        if role == self.INFO_ROLE:
+            # Изменение: Используем get_category_description для множественных категорий
+            return (
+                f"Тип: {reg_el.get('Тип', 'Документ')} | "
+                f"Номер: {reg_el.get('Номер документа', 'Нет')} | "
+                f"Дата: {reg_el.get('Дата подписания', 'Нет')} | "
+                f"Категория: {get_category_description(reg_el.get('Категория', ''))}"
+            )
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.CheckStateRole):
+        if not index.isValid() or role != Qt.ItemDataRole.CheckStateRole:
+            return False
+        self._checked[index.row()] = Qt.CheckState(value) == Qt.CheckState.Checked
+        self.dataChanged.emit(index, index, [role])
+        return True
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsUserCheckable
+
+    def set_all_checked(self, checked):
+        """Отметить или снять отметку со всех строк одним сигналом."""
+        if not self._elements:
+            return
+        self._checked = [checked] * len(self._elements)
+        self.dataChanged.emit(self.index(0), self.index(len(self._elements) - 1),
+                              [Qt.ItemDataRole.CheckStateRole])
+
+    def checked_elements(self):
+        return [reg_el for reg_el, checked in zip(self._elements, self._checked) if checked]
+
+
+class RegistryItemDelegate(QStyledItemDelegate):
+    """Отрисовка строки реестра (флажок, название, сведения) без виджетов на каждую строку."""
+
+    ROW_HEIGHT = 56
+    MARGIN = 5
+
+    def _checkbox_rect(self, option):
+        style = option.widget.style() if option.widget else QApplication.style()
+        size = style.pixelMetric(QStyle.PixelMetric.PM_IndicatorWidth, None, option.widget)
+        rect = option.rect
+        return QRect(rect.left() + self.MARGIN, rect.top() + (rect.height() - size) // 2, size, size)
+
+    def paint(self, painter, option, index):
+        option = QStyleOptionViewItem(option)
+        self.initStyleOption(option, index)
+        widget = option.widget
+        style = widget.style() if widget else QApplication.style()
+        # Фон строки (выделение, чередование) рисуется стилем без текста и флажка
+        option.text = ""
+        option.features &= ~QStyleOptionViewItem.ViewItemFeature.HasCheckIndicator
+        style.drawControl(QStyle.ControlElement.CE_ItemViewItem, option, painter, widget)
+
+        checkbox = QStyleOptionButton()
+        checkbox.rect = self._checkbox_rect(option)
+        checkbox.state = QStyle.StateFlag.State_Enabled
+        checked = index.data(Qt.ItemDataRole.CheckStateRole) == Qt.CheckState.Checked
+        checkbox.state |= QStyle.StateFlag.State_On if checked else QStyle.StateFlag.State_Off
+        style.drawPrimitive(QStyle.PrimitiveElement.PE_IndicatorCheckBox, checkbox, painter, widget)
+
+        left = checkbox.rect.right() + 2 * self.MARGIN
+        rect = option.rect
+        width = rect.right() - left - self.MARGIN
+        half = (rect.height() - 2 * self.MARGIN) // 2
+
+        selected = bool(option.state & QStyle.StateFlag.State_Selected)
+        text_color = option.palette.color(
+            QPalette.ColorRole.HighlightedText if selected else QPalette.ColorRole.Text)
+
+        painter.save()
+        painter.setPen(text_color)
+        title_font = painter.font()
+        title_font.setBold(True)
+        painter.setFont(title_font)
+        title_rect = QRect(left, rect.top() + self.MARGIN, width, half)
+        title = painter.fontMetrics().elidedText(index.data(RegistryListModel.TITLE_ROLE),
+                                                 Qt.TextElideMode.ElideRight, width)
+        painter.drawText(title_rect, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, title)
+
+        info_font = painter.font()
+        info_font.setBold(False)
+        info_font.setPixelSize(11)
+        painter.setFont(info_font)
+        painter.setPen(text_color if selected else QColor("#666666"))
+        info_rect = QRect(left, title_rect.bottom(), width, half)
+        info = painter.fontMetrics().elidedText(index.data(RegistryListModel.INFO_ROLE),
+                                                Qt.TextElideMode.ElideRight, width)
+        painter.drawText(info_rect, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, info)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    def editorEvent(self, event, model, option, index):
+        """Переключение флажка щелчком по нему или пробелом."""
+        if event.type() == QEvent.Type.MouseButtonRelease:
+            if event.button() != Qt.MouseButton.LeftButton or \
+                    not self._checkbox_rect(option).contains(event.position().toPoint()):
+                return False
+        elif event.type() == QEvent.Type.KeyPress:
+            if event.key() not in (Qt.Key.Key_Space, Qt.Key.Key_Select):
+                return False
+        else:
+            return False
+        checked = index.data(Qt.ItemDataRole.CheckStateRole) == Qt.CheckState.Checked
+        return model.setData(index, Qt.CheckState.Unchecked if checked else Qt.CheckState.Checked,
+                             Qt.ItemDataRole.CheckStateRole)
+
+
+class RegistryImportSignals(QObject):
+    """Сигналы фонового импорта из реестра (QRunnable сам не может их объявлять)."""
+    finished = pyqtSignal(int)
+    failed = pyqtSignal(str)
+
+
+class RegistryImportWorker(QRunnable):
+    """Перенос выбранных документов реестра в архив в пуле потоков.
+
+    Соединение SQLite нельзя использовать из другого потока, поэтому
+    задача открывает собственный DataManager на тот же файл БД.
+    """
+
+    def __init__(self, db_file, registry_items):
+        super().__init__()
+        self.db_file = db_file
+        self.registry_items = registry_items
+        self.signals = RegistryImportSignals()
+
+    def run(self):
+        try:
+            elements = [
+                {
+                    "Название": item["Название"],
+                    "Тип": "Документ",
+                    "Родитель ID": "",
+                    "Стеллаж": "",
+                    "Полка": "",
+                    "Номер документа": item.get("Номер документа", ""),
+                    "Дата подписания": item.get("Дата подписания", ""),
+                    "Категория": item.get("Категория", "")
+                }
+                for item in self.registry_items
+            ]
+            with DataManager(self.db_file) as manager, manager.batch():
+                manager.add_elements_bulk(elements)
+                for item in self.registry_items:
+                    manager.delete_from_registry(item["ID"])
+            self.signals.finished.emit(len(elements))
+        except Exception as e:
+            logger.error(f"Ошибка при импорте из реестра: {e}")
+            self.signals.failed.emit(str(e))
+
+
 class ImportFromRegistryDialog(QDialog):
     """Диалог выбора документов для импорта из реестра."""
 
@@ -54,42 +287,14 @@ class ImportFromRegistryDialog(QDialog):
         select_layout.addWidget(deselect_all_btn)
         select_layout.addStretch()
         layout.addLayout(select_layout)
-        self.list_widget = QListWidget()
-        self.list_widget.setAlternatingRowColors(True)
-        for reg_el in registry_elements:
-            item_widget = QWidget()
-            item_layout = QVBoxLayout(item_widget)
-            item_layout.setContentsMargins(5, 5, 5, 5)
-            checkbox = QCheckBox()
-            checkbox.setChecked(True)
-            category = reg_el.get('Категория', '')
-            category_icon = self._get_category_icon(category)
-            title = QLabel(f"{category_icon} <b>{reg_el['Название']}</b>")
-            title.setWordWrap(True)
-            # Изменение: Используем get_category_description для множественных категорий
-            category_display = get_category_description(category)
-            info = QLabel(
-                f"Тип: {reg_el.get('Тип', 'Документ')} | "
-                f"Номер: {reg_el.get('Номер документа', 'Нет')} | "
-                f"Дата: {reg_el.get('Дата подписания', 'Нет')} | "
-                f"Категория: {category_display}"
-            )
-            info.setStyleSheet("color: #666; font-size: 11px;")
-            row_layout = QHBoxLayout()
-            row_layout.addWidget(checkbox)
-            col_layout = QVBoxLayout()
-            col_layout.addWidget(title)
-            col_layout.addWidget(info)
-            row_layout.addLayout(col_layout)
-            row_layout.addStretch()
-            item_layout.addLayout(row_layout)
-            list_item = QListWidgetItem(self.list_widget)
-            list_item.setSizeHint(item_widget.sizeHint())
-            list_item.setData(Qt.ItemDataRole.UserRole, reg_el)
-            list_item.setData(Qt.ItemDataRole.UserRole + 1, checkbox)
-            self.list_widget.addItem(list_item)
-            self.list_widget.setItemWidget(list_item, item_widget)
-        layout.addWidget(self.list_widget)
+        # Строки рисуются делегатом: виджеты на каждую запись реестра не создаются
+        self.model = RegistryListModel(registry_elements, self)
+        self.list_view = QListView()
+        self.list_view.setAlternatingRowColors(True)
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setModel(self.model)
+        self.list_view.setItemDelegate(RegistryItemDelegate(self.list_view))
+        layout.addWidget(self.list_view)
         button_layout = QHBoxLayout()
         import_btn = QPushButton("📥 Импортировать выбранные")
         import_btn.clicked.connect(self.accept)
@@ -99,57 +304,41 @@ class ImportFromRegistryDialog(QDialog):
         button_layout.addWidget(import_btn)
         button_layout.addWidget(cancel_btn)
         layout.addLayout(button_layout)
-        apply_global_style(self)
 
-    def _get_category_icon(self, category):
+    @staticmethod
+    def _get_category_icon(category):
         """Получение иконки для категории (берём первую, если несколько)."""
-        icons = {
-            "ТС": "🔥",
-            "ВО": "🚽",
-            "ВС": "💧",
-            "ЛК": "🌧",
-            "УУТЭ": "📏",
-            "УУХВС": "🚰"
-        }
-        first_category = category.split(",")[0].strip() if category else ""
-        return icons.get(first_category, "🔖")
+        first_category = category.split(",", 1)[0].strip() if category else ""
+        return _CATEGORY_ICONS.get(first_category, "🔖")
 
     def _select_all(self):
         """Выбрать все элементы."""
-        for i in range(self.list_widget.count()):
-            item = self.list_widget.item(i)
-            checkbox = self.list_widget.itemWidget(item).findChild(QCheckBox)
-            checkbox.setChecked(True)
+        self.model.set_all_checked(True)
 
     def _deselect_all(self):
         """Снять выбор со всех элементов."""
-        for i in range(self.list_widget.count()):
-            item = self.list_widget.item(i)
-            checkbox = self.list_widget.itemWidget(item).findChild(QCheckBox)
-            checkbox.setChecked(False)
+        self.model.set_all_checked(False)
 
     def get_selected_items(self):
         """Получить выбранные элементы."""
-        selected = []
-        for i in range(self.list_widget.count()):
-            item = self.list_widget.item(i)
-            checkbox = item.data(Qt.ItemDataRole.UserRole + 1)
-            if checkbox.isChecked():
-                selected.append(item.data(Qt.ItemDataRole.UserRole))
-        return selected
+        return self.model.checked_elements()
 
 
 class EditWindow(QMainWindow):
     """Окно редактирования архива."""
 
-    def __init__(self, main_menu=None):
+    def __init__(self, main_menu=None, manager=None):
         super().__init__()
         self.main_menu = weakref.ref(main_menu) if main_menu else None
         self.setWindowTitle("Редактирование архива")
         self.resize(1200, 700)
-        self.manager = DataManager()
+        # Общий DataManager главного меню; собственный закрывается вместе с окном
+        self._owns_manager = manager is None
+        self.manager = manager or DataManager()
         self._updating = False
-        self._setup_styles()
+        self._import_worker = None
+        self._details_dialog = None
+        self._details_label = None
         self._init_models()
         self._create_actions()
         self._create_menu_bar()
@@ -159,10 +348,6 @@ class EditWindow(QMainWindow):
         self._animate_window()
         log_memory_usage()
 
-    def _setup_styles(self):
-        """Настройка стилей."""
-        apply_global_style(self)
-
     def _init_models(self):
         """Инициализация моделей."""
         self.model = ElementsTableModel(self.manager)
@@ -170,8 +355,14 @@ class EditWindow(QMainWindow):
         self.proxy_model.setSourceModel(self.model)
         self.proxy_model.setFilterKeyColumn(-1)
         self.proxy_model.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        self.tree_model = QStandardItemModel()
-        self.tree_model.setHorizontalHeaderLabels(["Иерархия архива"])
+        self.tree_model = self._new_tree_model()
+
+    @staticmethod
+    def _new_tree_model():
+        """Пустая модель дерева иерархии."""
+        tree_model = QStandardItemModel()
+        tree_model.setHorizontalHeaderLabels(["Иерархия архива"])
+        return tree_model
 
     def _create_actions(self):
         """Создание действий для меню."""
@@ -210,6 +401,8 @@ class EditWindow(QMainWindow):
         toolbar.setStyleSheet("QToolBar { background-color: #E3F2FD; padding: 6px; }")
 
         container = QWidget()
+        container.setStyleSheet(TOOLBAR_BTN_QSS)
+        self._toolbar_container = container
         layout = QHBoxLayout(container)
         layout.setContentsMargins(0, 0, 0, 0)
         layout.setSpacing(6)
@@ -226,18 +419,6 @@ class EditWindow(QMainWindow):
         for text, slot in buttons:
             btn = AnimatedButton(text)
             btn.setFixedHeight(34)
-            btn.setStyleSheet("""
-                QPushButton {
-                    background-color: white;
-                    border-radius: 8px;
-                    padding: 6px 12px;
-                    font-weight: bold;
-                    color: #1976D2;
-                }
-                QPushButton:hover {
-                    background-color: #BBDEFB;
-                }
-            """)
             btn.clicked.connect(slot)
             layout.addWidget(btn)
 
@@ -251,7 +432,12 @@ class EditWindow(QMainWindow):
         search_layout = QHBoxLayout()
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Поиск по названию...")
-        self.search_input.textChanged.connect(self._filter_table)
+        # Фильтр применяется после паузы в наборе, а не на каждый символ
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.setInterval(150)
+        self._filter_timer.timeout.connect(self._filter_table)
+        self.search_input.textChanged.connect(self._filter_timer.start)
         search_layout.addWidget(self.search_input)
         main_layout.addLayout(search_layout)
         splitter = QSplitter(Qt.Orientation.Horizontal)
@@ -264,9 +450,15 @@ class EditWindow(QMainWindow):
         self.table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.table.customContextMenuRequested.connect(self._show_context_menu)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        # Все строки одной высоты: заголовок строк не опрашивает модель при прокрутке
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(30)
+        self.table.setHorizontalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
         self.tree = QTreeView()
         self.tree.setModel(self.tree_model)
         self.tree.setAlternatingRowColors(True)
+        self.tree.setUniformRowHeights(True)
+        self.tree.setHorizontalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
         self.tree.doubleClicked.connect(self._on_tree_double_click)
         splitter.addWidget(self.table)
         splitter.addWidget(self.tree)
@@ -275,171 +467,192 @@ class EditWindow(QMainWindow):
 
     def _filter_table(self):
         """Фильтрация таблицы по поисковому запросу."""
-        self.proxy_model.setFilterWildcard(self.search_input.text())
-
+        text = self.search_input.text()
+        # Шаблон с * или ? обрабатывается как wildcard, обычный текст - как подстрока
+        if "*" in text or "?" in text:
+            self.proxy_model.setFilterWildcard(text)
+        else:
+            self.proxy_model.setFilterFixedString(text)
+
+    @pyqtSlot()
+    @ui_exceptions("Ошибка при добавлении элемента")
     def add_element(self):
         """Добавление нового элемента."""
-        try:
-            dialog = AddEditDialog(self.manager, parent=self)
-            if dialog.exec():
-                self.refresh_data()
-                if dialog.new_element_id:
-                    self._select_row_by_id(dialog.new_element_id)
-                logger.info("Элемент успешно добавлен")
-        except Exception as e:
-            logger.error(f"Ошибка при добавлении элемента: {e}")
-            QMessageBox.critical(self, "Ошибка", str(e))
+        dialog = AddEditDialog(self.manager, parent=self)
+        if dialog.exec():
+            self.refresh_data()
+            if dialog.new_element_id:
+                self._select_row_by_id(dialog.new_element_id)
+            logger.info("Элемент успешно добавлен")
 
+    @pyqtSlot()
+    @ui_exceptions("Ошибка при редактировании элемента")
     def edit_element(self):
         """Редактирование выбранного элемента."""
-        try:
-            selected = self.table.selectionModel().selectedRows()
-            if not selected:
-                QMessageBox.warning(self, "Предупреждение", "Выберите элемент для редактирования")
-                return
-            row = self.proxy_model.mapToSource(selected[0]).row()
-            el_id = self.model.get_id_by_row(row)
-            if not el_id:
-                QMessageBox.warning(self, "Ошибка", "Не удалось определить элемент")
-                return
-            element = self.manager.find_by_id(el_id)
-            if not element:
-                QMessageBox.warning(self, "Ошибка", "Элемент не найден")
-                return
-            dialog = AddEditDialog(self.manager, element, parent=self)
-            if dialog.exec():
-                self.refresh_data()
-                self._select_row_by_id(el_id)
-                logger.info(f"Элемент {el_id} отредактирован")
-        except Exception as e:
-            logger.error(f"Ошибка при редактировании элемента: {e}")
-            QMessageBox.critical(self, "Ошибка", str(e))
+        selected = self.table.selectionModel().selectedRows()
+        if not selected:
+            QMessageBox.warning(self, "Предупреждение", "Выберите элемент для редактирования")
+            return
+        row = self.proxy_model.mapToSource(selected[0]).row()
+        el_id = self.model.get_id_by_row(row)
+        if not el_id:
+            QMessageBox.warning(self, "Ошибка", "Не удалось определить элемент")
+            return
+        element = self.manager.find_by_id(el_id)
+        if not element:
+            QMessageBox.warning(self, "Ошибка", "Элемент не найден")
+            return
+        dialog = AddEditDialog(self.manager, element, parent=self)
+        if dialog.exec():
+            self.refresh_data()
+            self._select_row_by_id(el_id)
+            logger.info(f"Элемент {el_id} отредактирован")
 
+    @pyqtSlot()
+    @ui_exceptions("Ошибка при удалении элемента")
     def delete_element(self):
         """Удаление выбранного элемента."""
-        try:
-            selected = self.table.selectionModel().selectedRows()
-            if not selected:
-                QMessageBox.warning(self, "Предупреждение", "Выберите элемент для удаления")
-                return
-            row = self.proxy_model.mapToSource(selected[0]).row()
-            el_id = self.model.get_id_by_row(row)
-            if not el_id:
-                QMessageBox.warning(self, "Ошибка", "Не удалось определить элемент")
-                return
-            element = self.manager.find_by_id(el_id)
-            if not element:
-                QMessageBox.warning(self, "Ошибка", "Элемент не найден")
+        selected = self.table.selectionModel().selectedRows()
+        if not selected:
+            QMessageBox.warning(self, "Предупреждение", "Выберите элемент для удаления")
+            return
+        row = self.proxy_model.mapToSource(selected[0]).row()
+        el_id = self.model.get_id_by_row(row)
+        if not el_id:
+            QMessageBox.warning(self, "Ошибка", "Не удалось определить элемент")
+            return
+        element = self.manager.find_by_id(el_id)
+        if not element:
+            QMessageBox.warning(self, "Ошибка", "Элемент не найден")
+            return
+        subtree = self.manager.get_subtree(el_id)
+        if len(subtree) > 1:
+            reply = QMessageBox.question(
+                self,
+                "Подтверждение",
+                f"Элемент '{element['Название']}' содержит {len(subtree) - 1} дочерних элементов. Удалить их все?",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+            )
+            if reply != QMessageBox.StandardButton.Yes:
                 return
-            subtree = self.manager.get_subtree(el_id)
-            if len(subtree) > 1:
-                reply = QMessageBox.question(
-                    self,
-                    "Подтверждение",
-                    f"Элемент '{element['Название']}' содержит {len(subtree) - 1} дочерних элементов. Удалить их все?",
-                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
-                )
-                if reply != QMessageBox.StandardButton.Yes:
-                    return
-            self.manager.delete_element(el_id)
-            self.refresh_data()
-            logger.info(f"Элемент {el_id} удален")
-        except Exception as e:
-            logger.error(f"Ошибка при удалении элемента: {e}")
-            QMessageBox.critical(self, "Ошибка", str(e))
+        self.manager.delete_element(el_id)
+        self.refresh_data()
+        logger.info(f"Элемент {el_id} удален")
 
+    @pyqtSlot()
+    @ui_exceptions("Ошибка при импорте из реестра")
     def import_from_registry(self):
         """Импорт документов из реестра."""
-        try:
-            registry_elements = self.manager.load_registry()
-            if not registry_elements:
-                QMessageBox.information(self, "Информация", "Реестр пуст")
+        registry_elements = self.manager.load_registry()
+        if not registry_elements:
+            QMessageBox.information(self, "Информация", "Реестр пуст")
+            return
+        dialog = ImportFromRegistryDialog(registry_elements, self)
+        if dialog.exec():
+            selected_items = dialog.get_selected_items()
+            if not selected_items:
+                QMessageBox.warning(self, "Предупреждение", "Не выбраны элементы для импорта")
                 return
-            dialog = ImportFromRegistryDialog(registry_elements, self)
-            if dialog.exec():
-                selected_items = dialog.get_selected_items()
-                if not selected_items:
-                    QMessageBox.warning(self, "Предупреждение", "Не выбраны элементы для импорта")
-                    return
-                for item in selected_items:
-                    element = {
-                        "Название": item["Название"],
-                        "Тип": "Документ",
-                        "Родитель ID": "",
-                        "Стеллаж": "",
-                        "Полка": "",
-                        "Номер документа": item.get("Номер документа", ""),
-                        "Дата подписания": item.get("Дата подписания", ""),
-                        "Категория": item.get("Категория", "")
-                    }
-                    self.manager.add_element(element)
-                    self.manager.delete_from_registry(item["ID"])
-                self.refresh_data()
-                logger.info(f"Импортировано {len(selected_items)} элементов из реестра")
-        except Exception as e:
-            logger.error(f"Ошибка при импорте из реестра: {e}")
-            QMessageBox.critical(self, "Ошибка", str(e))
+            self._start_registry_import(selected_items)
+
+    def _start_registry_import(self, selected_items):
+        """Запуск импорта в пуле потоков; на время работы действия окна блокируются."""
+        self._set_actions_enabled(False)
+        # Задача пишет через своё соединение: отложенные правки на общем не должны держать блокировку
+        self.manager.flush_pending_writes()
+        self._import_worker = RegistryImportWorker(self.manager.db_file, selected_items)
+        self._import_worker.signals.finished.connect(self._on_registry_import_finished)
+        self._import_worker.signals.failed.connect(self._on_registry_import_failed)
+        QThreadPool.globalInstance().start(self._import_worker)
+
+    def _on_registry_import_finished(self, count):
+        self._import_worker = None
+        self._set_actions_enabled(True)
+        self.refresh_data()
+        logger.info(f"Импортировано {count} элементов из реестра")
 
+    def _on_registry_import_failed(self, message):
+        self._import_worker = None
+        self._set_actions_enabled(True)
+        self.refresh_data()
+        QMessageBox.critical(self, "Ошибка", message)
+
+    def _set_actions_enabled(self, enabled):
+        self._toolbar_container.setEnabled(enabled)
+        self.menuBar().setEnabled(enabled)
+        for action in (self.add_action, self.edit_action, self.delete_action,
+                       self.import_action, self.refresh_action):
+            action.setEnabled(enabled)
+
+    @pyqtSlot()
+    @ui_exceptions("Ошибка при обновлении данных")
     def refresh_data(self):
         """Обновление данных в таблице и дереве."""
+        if self._updating:
+            return
+        self._updating = True
+        # Пока модели перестраиваются, представления не перерисовываются
+        self.table.setUpdatesEnabled(False)
+        self.tree.setUpdatesEnabled(False)
         try:
-            if self._updating:
-                return
-            self._updating = True
             self.model.refresh()
             self._populate_tree()
-            self.table.resizeColumnsToContents()
-            logger.info("Данные обновлены в EditWindow")
-            self._updating = False
-        except Exception as e:
-            logger.error(f"Ошибка при обновлении данных: {e}")
-            QMessageBox.critical(self, "Ошибка", str(e))
+        finally:
+            self.tree.setUpdatesEnabled(True)
+            self.table.setUpdatesEnabled(True)
             self._updating = False
+        logger.info("Данные обновлены в EditWindow")
 
     def _populate_tree(self):
         """Заполнение дерева иерархии."""
-        self.tree_model.removeRows(0, self.tree_model.rowCount())
         elements = self.model.filtered_elements
-        root_items = {}
+        # Сначала создаём все узлы, затем привязываем каждый к родителю по ID:
+        # порядок элементов в списке не важен, поиск по дереву не нужен
+        items = {}
         for el in elements:
             item = QStandardItem(f"{el['Тип']}: {el['Название']}")
             item.setData(el["ID"], Qt.ItemDataRole.UserRole)
+            items[el["ID"]] = item
+        # Иерархия собирается вне модели (вставка в непривязанные узлы не порождает
+        # сигналов), а в модель добавляется одним appendRows верхнего уровня
+        top_level = []
+        for el in elements:
             parent_id = el.get("Родитель ID")
-            if not parent_id:
-                root_items[el["ID"]] = item
-                self.tree_model.appendRow(item)
+            parent_item = items.get(parent_id) if parent_id else None
+            if parent_item is not None:
+                parent_item.appendRow(items[el["ID"]])
             else:
-                parent_item = self._find_item_by_id(parent_id, self.tree_model.invisibleRootItem())
-                if parent_item:
-                    parent_item.appendRow(item)
-        self.tree.expandAll()
-
-    def _find_item_by_id(self, el_id, parent_item):
-        """Поиск элемента в дереве по ID."""
-        for row in range(parent_item.rowCount()):
-            item = parent_item.child(row)
-            if item.data(Qt.ItemDataRole.UserRole) == el_id:
-                return item
-            found = self._find_item_by_id(el_id, item)
-            if found:
-                return found
-        return None
-
+                top_level.append(items[el["ID"]])
+        # Новая модель подменяет старую целиком: старое дерево уничтожается одним
+        # деструктором, без поштучного removeRows с сигналами на каждую строку
+        new_model = self._new_tree_model()
+        new_model.invisibleRootItem().appendRows(top_level)
+        old_model = self.tree_model
+        old_selection = self.tree.selectionModel()
+        self.tree_model = new_model
+        self.tree.setModel(new_model)
+        if old_selection is not None:
+            old_selection.deleteLater()
+        old_model.deleteLater()
+        # Раскрываем только два верхних уровня (коробки и папки): expandAll раскладывает
+        # каждый узел дерева; глубже пользователь раскрывает сам (клавиша * - всё поддерево)
+        self.tree.expandToDepth(1)
+
+    @ui_exceptions("Ошибка при выборе элемента в таблице", show=False)
     def _select_row_by_id(self, el_id):
         """Выбор строки в таблице по ID."""
-        try:
-            for row in range(self.model.rowCount()):
-                if self.model.get_id_by_row(row) == el_id:
-                    index = self.proxy_model.index(row, 0)
-                    self.table.selectionModel().select(
-                        index,
-                        QItemSelectionModel.SelectionFlag.ClearAndSelect | QItemSelectionModel.SelectionFlag.Rows
-                    )
-                    self.table.scrollTo(index)
-                    logger.info(f"Элемент с ID {el_id} выбран в таблице")
-                    break
-        except Exception as e:
-            logger.error(f"Ошибка при выборе элемента в таблице: {e}")
+        row = self.model.row_for_id(el_id)
+        if row is None:
+            return
+        index = self.proxy_model.mapFromSource(self.model.index(row, 0))
+        if not index.isValid():  # строка скрыта фильтром поиска
+            return
+        self.table.selectionModel().select(
+            index,
+            QItemSelectionModel.SelectionFlag.ClearAndSelect | QItemSelectionModel.SelectionFlag.Rows
+        )
+        self.table.scrollTo(index)
+        logger.info(f"Элемент с ID {el_id} выбран в таблице")
 
     def _show_context_menu(self, position):
         """Показ контекстного меню."""
@@ -448,20 +661,27 @@ class EditWindow(QMainWindow):
         menu.addAction(self.delete_action)
         menu.exec(self.table.mapToGlobal(position))
 
+    @pyqtSlot(QModelIndex)
+    @ui_exceptions("Ошибка обработки клика по дереву", show=False)
     def _on_tree_double_click(self, index):
         """Обработка двойного клика по дереву."""
-        try:
-            el_id = index.data(Qt.ItemDataRole.UserRole)
-            if el_id:
-                element = self.manager.find_by_id(el_id)
-                if element:
-                    self._show_element_details(element, el_id)
-                    self._select_row_by_id(el_id)
-        except Exception as e:
-            logger.error(f"Ошибка обработки клика по дереву: {e}")
+        el_id = index.data(Qt.ItemDataRole.UserRole)
+        if el_id:
+            element = self.manager.find_by_id(el_id)
+            if element:
+                self._show_element_details(element, el_id, index.parent())
+                self._select_row_by_id(el_id)
 
-    def _show_element_details(self, element, el_id):
-        """Отображение детальной информации об элементе."""
+    def _show_element_details(self, element, el_id, parent_index=None):
+        """Отображение детальной информации об элементе.
+
+        parent_index - индекс родителя в дереве: его подпись уже имеет вид "Тип: Название",
+        поэтому повторно искать родителя в DataManager не нужно.
+        """
+        if parent_index is not None and parent_index.isValid():
+            parent_name = parent_index.data()
+        else:
+            parent_name = self._get_parent_name(element.get('Родитель ID'))
         icon = self._get_type_icon(element['Тип'])
         category = element.get('Категория', '')
         category_full = get_category_description(category)
@@ -471,36 +691,41 @@ class EditWindow(QMainWindow):
             f"ID: {el_id}\n"
             f"{icon} Тип: {element['Тип']}\n"
             f"📝 Название: {element['Название']}\n"
-            f"📂 Родитель: {self._get_parent_name(element.get('Родитель ID'))}\n"
+            f"📂 Родитель: {parent_name}\n"
             f"📚 Стеллаж: {element.get('Стеллаж') or 'Не указан'}\n"
             f"📊 Полка: {element.get('Полка') or 'Не указана'}\n"
             f"🔢 Номер документа: {element.get('Номер документа') or 'Не указан'}\n"
             f"📅 Дата подписания: {element.get('Дата подписания') or 'Не указана'}\n"
             f"{category_icon} Категория: {category_full}"
         )
-        QMessageBox.information(self, f"{icon} Детали элемента", details)
+        if self._details_dialog is None:
+            self._create_details_dialog()
+        self._details_label.setText(details)
+        self._details_dialog.setWindowTitle(f"{icon} Детали элемента")
+        self._details_dialog.adjustSize()
+        self._details_dialog.exec()
+
+    def _create_details_dialog(self):
+        """Создание окна деталей элемента (один раз, далее переиспользуется)."""
+        self._details_dialog = QDialog(self)
+        layout = QVBoxLayout(self._details_dialog)
+        self._details_label = QLabel(self._details_dialog)
+        self._details_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
+        layout.addWidget(self._details_label)
+        ok_btn = QPushButton("OK", self._details_dialog)
+        ok_btn.clicked.connect(self._details_dialog.accept)
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        button_layout.addWidget(ok_btn)
+        layout.addLayout(button_layout)
 
     def _get_type_icon(self, el_type):
         """Получение иконки для типа элемента."""
-        icons = {
-            "Документ": "📄",
-            "Коробка": "📦",
-            "Папка": "📁",
-            "Другое": "🗂"
-        }
-        return icons.get(el_type, "🗂")
+        return _TYPE_ICONS.get(el_type, "🗂")
 
     def _get_category_icon(self, category):
         """Получение иконки для категории."""
-        icons = {
-            "ТС": "🔥",
-            "ВО": "🚽",
-            "ВС": "💧",
-            "ЛК": "🌧",
-            "УУТЭ": "📏",
-            "УУХВС": "🚰"
-        }
-        return icons.get(category, "🔖")
+        return _CATEGORY_ICONS.get(category, "🔖")
 
     def _get_parent_name(self, parent_id):
         """Получение имени родителя."""
@@ -530,7 +755,8 @@ class EditWindow(QMainWindow):
     def closeEvent(self, event):
         """Обработка закрытия окна."""
         try:
-            self.manager.close()
+            if self._owns_manager:
+                self.manager.close()
             logger.info("EditWindow закрыто")
             QSettings().setValue("EditWindow/Geometry", self.saveGeometry())
         except Exception as e:
@@ -29,6 +29,18 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+
+def log_unhandled_exception(exc_type, exc_value, exc_tb):
+    """Журналирование необработанных исключений, в том числе из обработчиков сигналов Qt."""
+    if issubclass(exc_type, KeyboardInterrupt):
+        sys.__excepthook__(exc_type, exc_value, exc_tb)
+        return
+    logger.critical("Необработанное исключение", exc_info=(exc_type, exc_value, exc_tb))
+
+
+# Без собственного хука PyQt6 аварийно завершает приложение при исключении в слоте
+sys.excepthook = log_unhandled_exception
+
 if __name__ == "__main__":
     logger.info("Запуск приложения")
     app = PyQt6.QtWidgets.QApplication(sys.argv)
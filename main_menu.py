@@ -7,6 +7,7 @@ from PyQt6.QtWidgets import (
     QFrame
 )
 
+from data_manager import DataManager
 from edit_window import EditWindow
 from registry_window import RegistryWindow
 from view_window import ViewWindow
@@ -18,9 +19,13 @@ logger = logging.getLogger(__name__)
 class MainMenu(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.edit_window = EditWindow(main_menu=self)
-        self.view_window = ViewWindow(main_menu=self)
-        self.registry_window = RegistryWindow(main_menu=self)
+        # Окна создаются при первом открытии и работают через один DataManager:
+        # одно соединение SQLite (WAL и прочие PRAGMA настраиваются один раз) и общий кэш элементов.
+        # Соединение привязано к GUI-потоку - фоновые задачи открывают собственный DataManager
+        self._manager = None
+        self.edit_window = None
+        self.view_window = None
+        self.registry_window = None
         self.setWindowTitle("Архив документов")
         self.setWindowIcon(QIcon("icon.png"))
         self.resize(450, 400)
@@ -74,14 +79,25 @@ class MainMenu(QMainWindow):
         self.fade.setEasingCurve(QEasingCurve.Type.InOutQuad)
         self.fade.start()
 
+    def _shared_manager(self):
+        if self._manager is None:
+            self._manager = DataManager()
+        return self._manager
+
     def open_view(self):
+        if self.view_window is None:
+            self.view_window = ViewWindow(main_menu=self, manager=self._shared_manager())
         self.hide()
         self.view_window.show()
 
     def open_edit(self):
+        if self.edit_window is None:
+            self.edit_window = EditWindow(main_menu=self, manager=self._shared_manager())
         self.hide()
         self.edit_window.show()
 
     def open_registry(self):
+        if self.registry_window is None:
+            self.registry_window = RegistryWindow(main_menu=self, manager=self._shared_manager())
         self.hide()
         self.registry_window.show()
@@ -1,21 +1,67 @@
-from PyQt6.QtCore import Qt, QAbstractTableModel
+from PyQt6.QtCore import Qt, QAbstractTableModel, QCoreApplication, QTimer
 from PyQt6.QtGui import QFont
 
 from data_manager import get_category_description
 
+# Editable SQLiteTableModel columns -> elements table fields
+_COLUMN_TO_FIELD = {
+    1: "name",           # Название
+    2: "type",           # Тип
+    3: "parent_id",      # Родитель ID
+    4: "shelf",          # Стеллаж
+    5: "rack",           # Полка
+    6: "doc_number",     # Номер документа
+    7: "sign_date",      # Дата подписания
+    9: "category"        # Категория
+}
+# Editable columns that are also kept in all_elements -> all_elements keys
+_COLUMN_TO_CACHE_KEY = {1: "Название", 2: "Тип", 3: "Родитель ID", 4: "Стеллаж", 5: "Полка", 9: "Категория"}
+# Columns that take part in the location path of the element and of its descendants
+_LOCATION_COLUMNS = {1, 2, 3, 4, 5}
+# One SQL string per field, so the connection's statement cache reuses the prepared UPDATE
+_SQL_UPDATE_FIELD = {field: f"UPDATE elements SET {field} = ? WHERE id = ?" for field in _COLUMN_TO_FIELD.values()}
+_TOOLTIP_TEMPLATE = "Название: {}\nРасположение: {}\nКатегория: {}"
+# Cell edits are committed together after this idle period instead of one commit per edit
+_COMMIT_DELAY_MS = 200
+
 
 class SQLiteTableModel(QAbstractTableModel):
     """Model for SQLite table view."""
 
-    def __init__(self, conn):
+    def __init__(self, conn, manager=None):
         super().__init__()
         self.conn = conn
+        # DataManager sharing this connection: its element cache must not outlive our edits
+        self.manager = manager
+        # data() asks for FontRole for every painted cell - one shared instance
+        self._cell_font = QFont("Arial", 12)
         self.headers = ["ID", "Название", "Тип", "Родитель ID", "Стеллаж", "Полка", "Номер документа",
                         "Дата подписания", "Расположение", "Категория"]
         self.elements = []
         self.all_elements = {}
+        self._children_by_parent = {}
+        self._row_by_id = {}
+        self._tooltips = []
+        self._location_parts_cache = {}
+        self._commit_timer = QTimer(self)
+        self._commit_timer.setSingleShot(True)
+        self._commit_timer.setInterval(_COMMIT_DELAY_MS)
+        self._commit_timer.timeout.connect(self.flush_pending)
+        if manager is not None:
+            # Manager transactions commit our delayed edits first instead of absorbing or rolling them back
+            manager.add_pending_writer(self.flush_pending)
+        app = QCoreApplication.instance()
+        if app is not None:
+            # The window may be hidden rather than closed when the app exits
+            app.aboutToQuit.connect(self.flush_pending)
         self._cache_all_elements()
 
+    def flush_pending(self):
+        """Commit cell edits still waiting for the delayed commit."""
+        self._commit_timer.stop()
+        if self.conn.in_transaction:
+            self.conn.commit()
+
     def rowCount(self, parent=None):
         return len(self.elements)
 
@@ -30,13 +76,10 @@ class SQLiteTableModel(QAbstractTableModel):
             value = row_data[index.column()] if index.column() < len(row_data) else ""
             return str(value) if value else ""
         elif role == Qt.ItemDataRole.FontRole:
-            return QFont("Arial", 12)
+            return self._cell_font
         elif role == Qt.ItemDataRole.ToolTipRole:
-            row = self.elements[index.row()]
-            name = row[1] if len(row) > 1 else ""
-            location = row[8] if len(row) > 8 else ""
-            category = row[9] if len(row) > 9 else ""
-            return f"Название: {name}\nРасположение: {location}\nКатегория: {category}"
+            # Qt asks for the tooltip of every hovered cell - built once per row
+            return self._tooltips[index.row()]
         return None
 
     def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
@@ -44,6 +87,10 @@ class SQLiteTableModel(QAbstractTableModel):
             return self.headers[section]
         return None
 
+    def column_display_values(self, column):
+        """Display strings of one column for all rows (same values as data() for DisplayRole)."""
+        return [str(row[column]) if column < len(row) and row[column] else "" for row in self.elements]
+
     def flags(self, index):
         """Return item flags."""
         if not index.isValid():
@@ -67,23 +114,10 @@ class SQLiteTableModel(QAbstractTableModel):
         # Get the element ID
         el_id = self.elements[row][0]
 
-        # Map column to database field
-        column_to_field = {
-            1: "name",           # Название
-            2: "type",           # Тип
-            3: "parent_id",      # Родитель ID
-            4: "shelf",          # Стеллаж
-            5: "rack",           # Полка
-            6: "doc_number",     # Номер документа
-            7: "sign_date",      # Дата подписания
-            9: "category"        # Категория
-        }
-
-        if column not in column_to_field:
+        field = _COLUMN_TO_FIELD.get(column)
+        if field is None:
             return False
 
-        field = column_to_field[column]
-
         try:
             cursor = self.conn.cursor()
             # Handle empty strings for parent_id and other fields
@@ -92,21 +126,31 @@ class SQLiteTableModel(QAbstractTableModel):
             elif value == "":
                 value = None
 
-            cursor.execute(f"UPDATE elements SET {field} = ? WHERE id = ?", (value, el_id))
-            self.conn.commit()
+            cursor.execute(_SQL_UPDATE_FIELD[field], (value, el_id))
+            self._commit_timer.start()
+            if self.manager is not None:
+                # The manager reads this connection, so its reload sees the edit before the commit
+                self.manager.invalidate_cache()
 
-            # Update the local data
-            self.elements[row] = list(self.elements[row])
+            # Update the local data (rows are lists and are changed in place)
             self.elements[row][column] = value or ""
-            self.elements[row] = tuple(self.elements[row])
-
-            # Rebuild location path if necessary
-            if column in [2, 3, 4, 5]:  # Type, parent_id, shelf, rack
-                location = self._build_location_path(el_id)
-                self.elements[row] = list(self.elements[row])
-                self.elements[row][8] = location
-                self.elements[row] = tuple(self.elements[row])
 
+            # Keep the element cache in step with the database instead of reloading it
+            cache_key = _COLUMN_TO_CACHE_KEY.get(column)
+            cached = self.all_elements.get(el_id)
+            if cache_key and cached is not None:
+                if column == 3:
+                    self._move_child(el_id, cached["Родитель ID"], value or None)
+                cached[cache_key] = value or (None if column == 3 else "")
+
+            # Rebuild location path of the element and its descendants if necessary.
+            # A name only appears in the location of boxes and folders.
+            if column in _LOCATION_COLUMNS and not (
+                    column == 1 and self.elements[row][2] not in ("Коробка", "Папка")):
+                self._location_parts_cache.clear()
+                self._update_locations(el_id)
+
+            self._tooltips[row] = self._row_tooltip(self.elements[row])
             self.dataChanged.emit(index, index)
             return True
 
@@ -115,25 +159,100 @@ class SQLiteTableModel(QAbstractTableModel):
             logging.error(f"Ошибка обновления данных: {e}")
             return False
 
-    def _build_location_path(self, el_id):
-        path_parts = []
-        current_id = el_id
+    def _move_child(self, el_id, old_parent_id, new_parent_id):
+        """Move el_id between parent lists of _children_by_parent."""
+        if old_parent_id == new_parent_id:
+            return
+        siblings = self._children_by_parent.get(old_parent_id)
+        if siblings and el_id in siblings:
+            siblings.remove(el_id)
+        self._children_by_parent.setdefault(new_parent_id, []).append(el_id)
+
+    def _update_locations(self, el_id):
+        """Rebuild the location of an element and all its loaded descendants.
+
+        Only rows whose location actually changed are rewritten and signalled.
+        """
+        stack = [el_id]
         visited = set()
+        while stack:
+            current_id = stack.pop()
+            if current_id in visited:
+                continue
+            visited.add(current_id)
+            stack.extend(self._children_by_parent.get(current_id, ()))
+            row = self._row_by_id.get(current_id)
+            if row is None:  # not loaded under the current filters
+                continue
+            location = self._build_location_path(current_id)
+            if location == self.elements[row][8]:
+                continue
+            self.elements[row][8] = location
+            self._tooltips[row] = self._row_tooltip(self.elements[row])
+            location_index = self.index(row, 8)
+            self.dataChanged.emit(location_index, location_index)
+
+    @staticmethod
+    def _own_location_parts(element, has_shelf, has_rack):
+        """Location fragments added by one element; returns (fragments, has_shelf, has_rack)."""
+        own = []
+        if element["Стеллаж"] and element["Тип"] == "Коробка" and not has_shelf:
+            own.append(f"Стеллаж {element['Стеллаж']}")
+            has_shelf = True
+        if element["Полка"] and not has_rack:
+            own.append(f"Полка {element['Полка']}")
+            has_rack = True
+        if element["Тип"] in ["Коробка", "Папка"]:
+            own.append(f"{element['Тип']} '{element['Название']}'")
+        return own, has_shelf, has_rack
+
+    def _ancestor_location_parts(self, parent_id, has_shelf, has_rack, visited):
+        """Location fragments of parent_id and its ancestors, nearest first.
+
+        They depend only on the ancestor and on whether a shelf/rack fragment was
+        already collected below it, so they are memoized per (id, has_shelf, has_rack)
+        and shared between all elements of the same container.
+        """
+        current_id = parent_id
+        chain = []  # (memo key, own fragments) of ancestors not found in the memo
+        tail = ()
         while current_id and current_id not in visited:
+            key = (current_id, has_shelf, has_rack)
+            cached = self._location_parts_cache.get(key)
+            if cached is not None:
+                tail = cached
+                break
             visited.add(current_id)
             current = self.all_elements.get(current_id)
             if not current:
                 break
-            if current["Стеллаж"] and current["Тип"] == "Коробка" and not any("Стеллаж" in s for s in path_parts):
-                path_parts.append(f"Стеллаж {current['Стеллаж']}")
-            if current["Полка"] and not any("Полка" in s for s in path_parts):
-                path_parts.append(f"Полка {current['Полка']}")
-            if current["Тип"] in ["Коробка", "Папка"]:
-                path_parts.append(f"{current['Тип']} '{current['Название']}'")
+            own, has_shelf, has_rack = self._own_location_parts(current, has_shelf, has_rack)
+            chain.append((key, own))
             current_id = current.get("Родитель ID")
-        path = " / ".join(reversed(path_parts))
-        doc = self.all_elements.get(el_id)
-        if doc and doc['Тип'] == 'Документ':
+        # A cycle in the hierarchy makes the result depend on the start element - not memoized
+        memoize = not (current_id and current_id in visited)
+        for key, own in reversed(chain):
+            tail = (*own, *tail)
+            if memoize:
+                self._location_parts_cache[key] = tail
+        return tail
+
+    @staticmethod
+    def _row_tooltip(row):
+        return _TOOLTIP_TEMPLATE.format(row[1], row[8], row[9])
+
+    def _build_location_path(self, el_id):
+        current = self.all_elements.get(el_id)
+        if not current:
+            return "Без расположения"
+        own, has_shelf, has_rack = self._own_location_parts(current, False, False)
+        parent_id = current.get("Родитель ID")
+        parent_parts = self._location_parts_cache.get((parent_id, has_shelf, has_rack))
+        if parent_parts is None:
+            parent_parts = self._ancestor_location_parts(parent_id, has_shelf, has_rack, {el_id})
+        path = " / ".join(reversed((*own, *parent_parts))) if own else " / ".join(reversed(parent_parts))
+        doc = current
+        if doc['Тип'] == 'Документ':
             doc_location = []
             if doc['Стеллаж']: doc_location.append(f"Стеллаж {doc['Стеллаж']}")
             if doc['Полка']: doc_location.append(f"Полка {doc['Полка']}")
@@ -143,11 +262,13 @@ class SQLiteTableModel(QAbstractTableModel):
 
     def refresh_cache(self):
         """Fully reload cache and data."""
+        self.flush_pending()
         self._cache_all_elements()
         self.load_data()
 
     def _cache_all_elements(self):
         """Cache all elements for quick lookup."""
+        self._location_parts_cache.clear()
         try:
             cursor = self.conn.cursor()
             cursor.execute("SELECT id, name, type, parent_id, shelf, rack, category FROM elements")
@@ -155,10 +276,14 @@ class SQLiteTableModel(QAbstractTableModel):
                 "ID": r[0], "Название": r[1], "Тип": r[2], "Родитель ID": r[3] or None,
                 "Стеллаж": r[4] or "", "Полка": r[5] or "", "Категория": r[6] or ""
             } for r in cursor.fetchall()}
+            self._children_by_parent = {}
+            for el_id, element in self.all_elements.items():
+                self._children_by_parent.setdefault(element["Родитель ID"], []).append(el_id)
         except Exception as e:
             import logging
             logging.error(f"Ошибка кэширования элементов: {e}")
             self.all_elements = {}
+            self._children_by_parent = {}
 
     def load_data(self, filters=None):
         """Load data with filters."""
@@ -190,17 +315,23 @@ class SQLiteTableModel(QAbstractTableModel):
             cursor = self.conn.cursor()
             cursor.execute(query, params)
             rows = cursor.fetchall()
-            self.elements.clear()
+            elements = []
             for row in rows:
                 el_id, name, el_type, parent_id, shelf, rack, doc_number, sign_date, category = row
                 location = self._build_location_path(el_id)
-                extended_row = (el_id, name, el_type, parent_id or "", shelf or "", rack or "",
-                                doc_number or "", sign_date or "", location, category or "")
-                self.elements.append(extended_row)
-            self.layoutChanged.emit()
+                extended_row = [el_id, name, el_type, parent_id or "", shelf or "", rack or "",
+                                doc_number or "", sign_date or "", location, category or ""]
+                elements.append(extended_row)
         except Exception as e:
             import logging
             logging.error(f"Ошибка загрузки данных: {e}")
+            return
+        # A single model reset instead of layoutChanged: the proxy re-filters once
+        self.beginResetModel()
+        self.elements[:] = elements
+        self._row_by_id = {row[0]: i for i, row in enumerate(self.elements)}
+        self._tooltips = [self._row_tooltip(row) for row in self.elements]
+        self.endResetModel()
 
 
 class ElementsTableModel(QAbstractTableModel):
@@ -209,9 +340,12 @@ class ElementsTableModel(QAbstractTableModel):
     def __init__(self, manager):
         super().__init__()
         self.manager = manager
+        self._cell_font = QFont("Arial", 12)
         self.headers = ["ID", "Название", "Тип", "Родитель ID", "Стеллаж", "Полка", "Номер документа",
                         "Дата подписания", "Категория"]
         self.filtered_elements = []
+        self._id_to_row = {}
+        self._display = []
         self.refresh()
 
     def rowCount(self, parent=None):
@@ -225,23 +359,17 @@ class ElementsTableModel(QAbstractTableModel):
             return self.filtered_elements[row].get("ID")
         return None
 
+    def row_for_id(self, el_id):
+        """Номер строки элемента по ID (None, если элемента нет в модели)."""
+        return self._id_to_row.get(el_id)
+
     def data(self, index, role=Qt.ItemDataRole.DisplayRole):
         if not index.isValid() or index.row() >= len(self.filtered_elements):
             return None
         if role == Qt.ItemDataRole.DisplayRole:
-            key = self.headers[index.column()]
-            element = self.filtered_elements[index.row()]
-            if key == "Категория":
-                # Изменение: Преобразуем коды категорий в полные описания
-                return get_category_description(element.get("Категория", ""))
-            value = element.get(key, "")
-            # Для "Родитель ID" показываем название родителя вместо ID
-            if key == "Родитель ID" and value:
-                parent = self.manager.find_by_id(value)
-                return f"{parent['Тип']}: {parent['Название']}" if parent else "Корень"
-            return str(value) if value else "Не указан"
+            return self._display[index.row()][index.column()]
         elif role == Qt.ItemDataRole.FontRole:
-            return QFont("Arial", 12)
+            return self._cell_font
         return None
 
     def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
@@ -249,15 +377,38 @@ class ElementsTableModel(QAbstractTableModel):
             return self.headers[section]
         return None
 
+    def _display_row(self, element, by_id):
+        """Display strings for one element, in header order."""
+        row = []
+        for key in self.headers:
+            if key == "Категория":
+                # Изменение: Преобразуем коды категорий в полные описания
+                row.append(get_category_description(element.get("Категория", "")))
+                continue
+            value = element.get(key, "")
+            # Для "Родитель ID" показываем название родителя вместо ID
+            if key == "Родитель ID" and value:
+                parent = by_id.get(value)
+                row.append(f"{parent['Тип']}: {parent['Название']}" if parent else "Корень")
+            else:
+                row.append(str(value) if value else "Не указан")
+        return row
+
     def refresh(self):
         """Refresh data from manager."""
         try:
-            self.beginResetModel()
-            elements = self.manager.load_elements()
-            self.filtered_elements.clear()
-            self.filtered_elements = elements.copy()
-            self.layoutChanged.emit()
-            self.endResetModel()
+            self.manager.invalidate_cache()
+            elements = list(self.manager.get_elements())
+            # data() вызывается на каждую перерисовку ячейки - строки готовим заранее
+            by_id = {el["ID"]: el for el in elements}
+            display = [self._display_row(el, by_id) for el in elements]
         except Exception as e:
             import logging
-            logging.error(f"Ошибка обновления ElementsTableModel: {e}")
\ No newline at end of file
+            logging.error(f"Ошибка обновления ElementsTableModel: {e}")
+            return
+        # A single model reset: views and proxies rebuild once
+        self.beginResetModel()
+        self.filtered_elements = elements
+        self._id_to_row = {el["ID"]: i for i, el in enumerate(elements)}
+        self._display = display
+        self.endResetModel()
\ No newline at end of file
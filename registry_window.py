@@ -1,8 +1,7 @@
 import logging
-import uuid
 import weakref
 
-from PyQt6.QtCore import Qt, QTimer, QPropertyAnimation, QEasingCurve, QSortFilterProxyModel
+from PyQt6.QtCore import Qt, QTimer, QPropertyAnimation, QEasingCurve, QSortFilterProxyModel, QModelIndex
 from PyQt6.QtGui import QFont
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QPushButton, QTableView,
@@ -17,10 +16,25 @@ from ui_theme import apply_global_style
 
 logger = logging.getLogger(__name__)
 
+# Реестр подгружается в таблицу страницами по мере прокрутки
+_REGISTRY_PAGE_SIZE = 200
+
 
 class AddDocumentDialog(QDialog):
     """Диалог для удобного добавления документа с несколькими полями."""
 
+    # Пункты выбора категории: (подпись, код, сохраняемый в БД)
+    CATEGORIES = [
+        ("Не указана", ""),
+        ("ТС - Теплосеть", "ТС"),
+        ("ВО - Хоз. бытовая канализация", "ВО"),
+        ("ВС - Водоснабжение", "ВС"),
+        ("ЛК - Ливневая канализация", "ЛК"),
+        ("УУТЭ", "УУТЭ"),
+        ("УУХВС", "УУХВС"),
+    ]
+    CATEGORY_INDEX = {code: i for i, (_, code) in enumerate(CATEGORIES)}
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Добавить документ в реестр")
@@ -70,15 +84,8 @@ class AddDocumentDialog(QDialog):
         # Категория инженерных систем
         category_label = QLabel("Категория:")
         self.category_combo = QComboBox()
-        self.category_combo.addItems([
-            "Не указана",
-            "ТС - Теплосеть",
-            "ВО - Хоз. бытовая канализация",
-            "ВС - Водоснабжение",
-            "ЛК - Ливневая канализация",
-            "УУТЭ",
-            "УУХВС"
-        ])
+        for label, code in self.CATEGORIES:
+            self.category_combo.addItem(label, code)
         layout.addRow(category_label, self.category_combo)
 
         # Кнопки
@@ -89,11 +96,19 @@ class AddDocumentDialog(QDialog):
         button_box.rejected.connect(self.reject)
         layout.addRow(button_box)
 
+    def reset(self, title="Добавить документ в реестр"):
+        """Возвращает поля к значениям по умолчанию перед повторным показом диалога."""
+        self.setWindowTitle(title)
+        self.name_edit.clear()
+        self.type_edit.setText("Документ")
+        self.doc_number_edit.clear()
+        self.sign_date_edit.setDate(QDate.currentDate())
+        self.status_edit.setText("Ожидает размещения")
+        self.category_combo.setCurrentIndex(0)
+
     def get_data(self):
         """Возвращает введенные данные."""
-        category_text = self.category_combo.currentText()
-        # Извлекаем только код категории (до " -")
-        category = category_text.split(" -")[0].strip() if category_text != "Не указана" else ""
+        category = self.category_combo.currentData() or ""
 
         return {
             'name': self.name_edit.toPlainText().strip(),
@@ -108,14 +123,15 @@ class AddDocumentDialog(QDialog):
 class RegistryWindow(QMainWindow):
     """Window for managing incoming documents before archiving."""
 
-    def __init__(self, main_menu=None):
+    def __init__(self, main_menu=None, manager=None):
         super().__init__()
         self.main_menu = weakref.ref(main_menu) if main_menu else None
         self.setWindowTitle("Реестр принесенных документов")
         self.resize(1200, 700)
         logger.info("Инициализация RegistryWindow начата")
 
-        self.manager = DataManager()
+        self.manager = manager or DataManager()
+        self._doc_dialog = None
         self._create_registry_table()
         self._setup_ui()
         self.refresh_data()
@@ -136,7 +152,12 @@ class RegistryWindow(QMainWindow):
         search_label.setStyleSheet("font-size: 14px; font-weight: bold; color: #333;")
         self.search_line = QLineEdit()
         self.search_line.setPlaceholderText("Поиск по названию, номеру, типу, статусу...")
-        self.search_line.textChanged.connect(self.filter_table)
+        # Поиск выполняется запросом к БД после паузы в наборе, а не на каждый символ
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(150)
+        self._search_timer.timeout.connect(self.filter_table)
+        self.search_line.textChanged.connect(self._search_timer.start)
         self.search_line.setClearButtonEnabled(True)
         search_container.addWidget(search_label)
         search_container.addWidget(self.search_line)
@@ -145,10 +166,9 @@ class RegistryWindow(QMainWindow):
         # Таблица
         self.table = QTableView()
         self.model = RegistryTableModel(self.manager)
+        # Прокси-модель только сортирует: отбор по поиску выполняет сама модель (FTS-индекс реестра)
         self.proxy_model = QSortFilterProxyModel()
         self.proxy_model.setSourceModel(self.model)
-        self.proxy_model.setFilterKeyColumn(-1)  # Поиск по всем колонкам
-        self.proxy_model.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
         self.table.setModel(self.proxy_model)
         self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
         self.table.setSelectionMode(QTableView.SelectionMode.SingleSelection)
@@ -159,6 +179,10 @@ class RegistryWindow(QMainWindow):
         self.table.setFont(QFont("Arial", 12))
         self.table.setWordWrap(True)
         self.table.verticalHeader().setDefaultSectionSize(40)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        # Ширина столбцов (resizeColumnsToContents) считается по видимым строкам,
+        # а не по всем загруженным: точность задаётся у горизонтального заголовка
+        self.table.horizontalHeader().setResizeContentsPrecision(0)
         layout.addWidget(self.table)
 
         # Кнопки управления
@@ -252,9 +276,28 @@ class RegistryWindow(QMainWindow):
         QTimer.singleShot(100, self.table.resizeColumnsToContents)
         logger.info("Данные реестра обновлены")
 
+    @staticmethod
+    def _registry_document(data):
+        """Данные AddDocumentDialog.get_data() в формате записей реестра DataManager."""
+        return {
+            "Название": data['name'],
+            "Тип": data['type'],
+            "Номер документа": data['doc_number'],
+            "Дата подписания": data['sign_date'],
+            "Статус": data['status'],
+            "Категория": data['category']
+        }
+
+    def _get_doc_dialog(self, title="Добавить документ в реестр"):
+        """Диалог документа создается один раз и переиспользуется со сброшенными полями."""
+        if self._doc_dialog is None:
+            self._doc_dialog = AddDocumentDialog(self)
+        self._doc_dialog.reset(title)
+        return self._doc_dialog
+
     def add_document(self):
         """Добавление нового документа через диалог."""
-        dialog = AddDocumentDialog(self)
+        dialog = self._get_doc_dialog()
         if dialog.exec() == QDialog.DialogCode.Accepted:
             data = dialog.get_data()
             if not data['name']:
@@ -262,15 +305,7 @@ class RegistryWindow(QMainWindow):
                 return
 
             try:
-                el_id = str(uuid.uuid4())
-                cursor = self.manager.conn.cursor()
-                cursor.execute(
-                    """INSERT INTO registry (id, name, type, doc_number, sign_date, status, category)
-                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                    (el_id, data['name'], data['type'], data['doc_number'],
-                     data['sign_date'], data['status'], data['category'])
-                )
-                self.manager.conn.commit()
+                self.manager.add_to_registry([self._registry_document(data)])
                 self.refresh_data()
                 logger.info(f"Документ добавлен в реестр: {data['name']}")
                 QMessageBox.information(self, "Успех", "Документ успешно добавлен!")
@@ -299,8 +334,7 @@ class RegistryWindow(QMainWindow):
                 QMessageBox.warning(self, "Ошибка", "Документ не найден")
                 return
 
-            dialog = AddDocumentDialog(self)
-            dialog.setWindowTitle("Редактировать документ")
+            dialog = self._get_doc_dialog("Редактировать документ")
             dialog.name_edit.setPlainText(row[0])
             dialog.type_edit.setText(row[1] or "Документ")
             dialog.doc_number_edit.setText(row[2] or "")
@@ -312,12 +346,8 @@ class RegistryWindow(QMainWindow):
 
             # Установка категории
             category = row[5] or ""
-            if category:
-                # Ищем соответствующий пункт в комбобоксе
-                for i in range(dialog.category_combo.count()):
-                    if dialog.category_combo.itemText(i).startswith(category):
-                        dialog.category_combo.setCurrentIndex(i)
-                        break
+            if category in dialog.CATEGORY_INDEX:
+                dialog.category_combo.setCurrentIndex(dialog.CATEGORY_INDEX[category])
 
             if dialog.exec() == QDialog.DialogCode.Accepted:
                 data = dialog.get_data()
@@ -325,19 +355,7 @@ class RegistryWindow(QMainWindow):
                     QMessageBox.warning(self, "Ошибка", "Название документа обязательно!")
                     return
 
-                cursor.execute(
-                    """UPDATE registry
-                       SET name=?,
-                           type=?,
-                           doc_number=?,
-                           sign_date=?,
-                           status=?,
-                           category=?
-                       WHERE id = ?""",
-                    (data['name'], data['type'], data['doc_number'],
-                     data['sign_date'], data['status'], data['category'], el_id)
-                )
-                self.manager.conn.commit()
+                self.manager.update_registry(el_id, self._registry_document(data))
                 self.refresh_data()
                 logger.info(f"Документ обновлен: {el_id}")
                 QMessageBox.information(self, "Успех", "Документ успешно обновлен!")
@@ -375,8 +393,7 @@ class RegistryWindow(QMainWindow):
 
     def filter_table(self):
         """Фильтрация таблицы по поисковому запросу."""
-        search_text = self.search_line.text().strip()
-        self.proxy_model.setFilterRegularExpression(search_text)
+        self.model.search(self.search_line.text())
 
     def back_to_menu(self):
         """Возврат в главное меню."""
@@ -401,8 +418,13 @@ class RegistryTableModel(QAbstractTableModel):
     def __init__(self, manager):
         super().__init__()
         self.manager = manager
+        # data() запрашивает FontRole для каждой отрисовываемой ячейки - один общий шрифт
+        self._cell_font = QFont("Arial", 12)
         self.headers = ["ID", "Название", "Тип", "Номер документа", "Дата подписания", "Статус", "Категория"]
         self.filtered_elements = []
+        self._columns = []
+        self._search_text = ""
+        self._has_more = False
         self.refresh()
 
     def rowCount(self, parent=None):
@@ -421,11 +443,9 @@ class RegistryTableModel(QAbstractTableModel):
             return None
 
         if role == Qt.ItemDataRole.DisplayRole:
-            key = self.headers[index.column()]
-            value = self.filtered_elements[index.row()].get(key, "")
-            return str(value) if value else ""
+            return self._columns[index.column()][index.row()]
         elif role == Qt.ItemDataRole.FontRole:
-            return QFont("Arial", 12)
+            return self._cell_font
         return None
 
     def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
@@ -433,8 +453,43 @@ class RegistryTableModel(QAbstractTableModel):
             return self.headers[section]
         return None
 
+    def search(self, text):
+        """Отбор записей по тексту поиска (пустой текст - все записи)."""
+        self._search_text = text.strip()
+        self.refresh()
+
     def refresh(self):
-        """Обновление данных модели."""
+        """Обновление данных модели (с учётом текущего поиска): загружается первая страница."""
         self.beginResetModel()
-        self.filtered_elements = self.manager.load_registry()
+        self.filtered_elements = []
+        self._columns = [[] for _ in self.headers]
+        self._append_page(self._load_page())
         self.endResetModel()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        """Подгрузка следующей страницы, когда представление докрутило до конца загруженных строк."""
+        if parent.isValid():
+            return
+        page = self._load_page()
+        if not page:
+            self._has_more = False
+            return
+        start = len(self.filtered_elements)
+        self.beginInsertRows(QModelIndex(), start, start + len(page) - 1)
+        self._append_page(page)
+        self.endInsertRows()
+
+    def _load_page(self):
+        return self.manager.search_registry(
+            self._search_text, limit=_REGISTRY_PAGE_SIZE, offset=len(self.filtered_elements)
+        )
+
+    def _append_page(self, page):
+        self._has_more = len(page) == _REGISTRY_PAGE_SIZE
+        self.filtered_elements.extend(page)
+        # Строки для отображения готовятся один раз по столбцам: data() - два обращения по индексу
+        for key, column in zip(self.headers, self._columns):
+            column.extend(str(el.get(key) or "") for el in page)
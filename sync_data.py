@@ -1,12 +1,15 @@
 #!/usr/bin/env python3
 """
-Скрипт для синхронизации данных между базой данных и JSON файлом.
+Скрипт для синхронизации данных между базой данных и NDJSON файлом.
 Используется для синхронизации данных между локальной машиной и сайтом через git.
+Файл хранит по одной записи на строку, поэтому в git меняются только строки
+изменённых записей.
 """
 import os
 import sys
 import json
 import logging
+from functools import cache
 from pathlib import Path
 
 # Настройка логирования
@@ -18,18 +21,27 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from data_manager import DataManager, get_app_dir
 
+SYNC_FILE_NAME = 'archive_data.ndjson'
+COMPRESSED_SYNC_FILE_NAME = SYNC_FILE_NAME + '.zst'
+LEGACY_SYNC_FILE_NAME = 'archive_data.json'  # прежний формат: один JSON документ
 
-def export_data():
-    """Экспортирует данные из базы данных в JSON файл."""
+
+@cache
+def sync_path(name=SYNC_FILE_NAME):
+    """Путь к файлу синхронизации в каталоге приложения (вычисляется один раз)."""
+    return Path(get_app_dir()) / name
+
+
+def export_data(compress=False):
+    """Экспортирует данные из базы данных в NDJSON файл (compress - со сжатием zstd)."""
     try:
         logger.info("Начинаем экспорт данных...")
-        manager = DataManager()
+        sync_file = sync_path(COMPRESSED_SYNC_FILE_NAME if compress else SYNC_FILE_NAME)
 
-        # Создаем директорию для данных, если её нет
-        data_dir = get_app_dir()
-        sync_file = os.path.join(data_dir, 'archive_data.json')
+        with DataManager() as manager:
+            exported = manager.export_to_ndjson(sync_file)
 
-        if manager.export_to_json(sync_file):
+        if exported:
             logger.info(f"✅ Данные успешно экспортированы в {sync_file}")
             return True
         else:
@@ -39,26 +51,32 @@ def export_data():
     except Exception as e:
         logger.error(f"❌ Критическая ошибка при экспорте: {e}")
         return False
-    finally:
-        if 'manager' in locals():
-            manager.close()
 
 
 def import_data():
-    """Импортирует данные из JSON файла в базу данных."""
+    """Импортирует данные из NDJSON файла (или прежнего JSON файла) в базу данных."""
     try:
         logger.info("Начинаем импорт данных...")
-        manager = DataManager()
-
-        # Путь к файлу синхронизации
-        data_dir = get_app_dir()
-        sync_file = os.path.join(data_dir, 'archive_data.json')
-
-        if not os.path.exists(sync_file):
-            logger.warning(f"Файл синхронизации {sync_file} не найден")
+        # NDJSON, сжатый NDJSON или файл прежнего формата: берётся самый свежий,
+        # чтобы устаревший файл другого формата не перекрыл последний экспорт
+        candidates = (SYNC_FILE_NAME, COMPRESSED_SYNC_FILE_NAME, LEGACY_SYNC_FILE_NAME)
+        existing = [sync_path(name) for name in candidates if sync_path(name).exists()]
+        if not existing:
+            logger.warning(f"Файл синхронизации {sync_path()} не найден")
             return False
-
-        if manager.import_from_json(sync_file):
+        sync_file = max(existing, key=lambda path: path.stat().st_mtime)
+        if len(existing) > 1:
+            skipped = ", ".join(path.name for path in existing if path != sync_file)
+            logger.warning(f"Выбран самый свежий файл синхронизации {sync_file.name} (пропущены: {skipped})")
+
+        with DataManager() as manager:
+            if sync_file.name == LEGACY_SYNC_FILE_NAME:
+                # Файл синхронизации в прежнем формате (один JSON документ)
+                imported = manager.import_from_json(sync_file)
+            else:
+                imported = manager.import_from_ndjson(sync_file)
+
+        if imported:
             logger.info(f"✅ Данные успешно импортированы из {sync_file}")
             return True
         else:
@@ -68,23 +86,21 @@ def import_data():
     except Exception as e:
         logger.error(f"❌ Критическая ошибка при импорте: {e}")
         return False
-    finally:
-        if 'manager' in locals():
-            manager.close()
 
 
 def main():
     """Основная функция скрипта."""
     if len(sys.argv) < 2:
         print("Использование:")
-        print("  python sync_data.py export  # Экспорт данных в JSON")
-        print("  python sync_data.py import  # Импорт данных из JSON")
+        print("  python sync_data.py export  # Экспорт данных в NDJSON")
+        print("  python sync_data.py export --zstd  # Экспорт со сжатием zstd (не для git)")
+        print("  python sync_data.py import  # Импорт данных из NDJSON (или прежнего JSON)")
         sys.exit(1)
 
     command = sys.argv[1].lower()
 
     if command == 'export':
-        success = export_data()
+        success = export_data(compress='--zstd' in sys.argv[2:])
     elif command == 'import':
         success = import_data()
     else:
@@ -61,44 +61,79 @@ class EnhancedProxyModel(QSortFilterProxyModel):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.filters = {}
+        # Маска совпадений по строкам источника: считается один раз на изменение
+        # фильтров или данных, а filterAcceptsRow только читает её
+        self._mask = None
         self.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
 
+    def setSourceModel(self, model):
+        old_model = self.sourceModel()
+        if old_model is not None:
+            for signal in self._source_change_signals(old_model):
+                signal.disconnect(self._reset_mask)
+        # Подключаемся до базового класса: маска должна сброситься раньше,
+        # чем прокси начнёт перефильтровывать строки по сигналу источника
+        if model is not None:
+            for signal in self._source_change_signals(model):
+                signal.connect(self._reset_mask)
+        self._mask = None
+        super().setSourceModel(model)
+
+    @staticmethod
+    def _source_change_signals(model):
+        return (model.modelReset, model.layoutChanged, model.dataChanged,
+                model.rowsInserted, model.rowsRemoved)
+
+    def _reset_mask(self, *args):
+        self._mask = None
+
     def set_filter(self, column, text):
         """Установка фильтра для конкретной колонки."""
         if text:
             self.filters[column] = text.lower()
         elif column in self.filters:
             del self.filters[column]
+        self._mask = None
         self.invalidateFilter()
 
     def clear_filters(self):
         """Очистка всех фильтров."""
         self.filters.clear()
+        self._mask = None
         self.invalidateFilter()
 
+    def _build_mask(self):
+        """Совпадения по всем фильтрам сразу для всех строк источника."""
+        model = self.sourceModel()
+        mask = [True] * model.rowCount()
+        for column, filter_text in self.filters.items():
+            if hasattr(model, "column_display_values"):
+                values = model.column_display_values(column)
+            else:
+                values = [str(model.data(model.index(row, column), Qt.ItemDataRole.DisplayRole) or "")
+                          for row in range(len(mask))]
+            mask = [ok and filter_text in value.lower() for ok, value in zip(mask, values)]
+        return mask
+
     def filterAcceptsRow(self, source_row, source_parent):
         """Проверка строки на соответствие всем фильтрам."""
         if not self.filters:
             return True
-        model = self.sourceModel()
-        for column, filter_text in self.filters.items():
-            index = model.index(source_row, column, source_parent)
-            data = str(model.data(index, Qt.ItemDataRole.DisplayRole) or "").lower()
-            if filter_text not in data:
-                return False
-        return True
+        if self._mask is None or len(self._mask) != self.sourceModel().rowCount():
+            self._mask = self._build_mask()
+        return self._mask[source_row]
 
 
 class ViewWindow(QMainWindow):
     """Окно просмотра архива с улучшенными фильтрами и поиском."""
 
-    def __init__(self, main_menu=None):
+    def __init__(self, main_menu=None, manager=None):
         super().__init__(parent=None)
         self.main_menu = weakref.ref(main_menu) if main_menu else None
         self.setWindowFlags(self.windowFlags() | Qt.WindowType.Window)
         self.setWindowTitle("Просмотр архива")
         self.resize(1500, 850)
-        self.manager = DataManager()
+        self.manager = manager or DataManager()
         self.db_file = self.manager.db_file
         # Сохранение BASE_URL для использования в QR-кодах
         self.base_url = None
@@ -121,7 +156,7 @@ class ViewWindow(QMainWindow):
 
     def _init_model(self):
         """Инициализация моделей для таблицы и дерева."""
-        self.model = SQLiteTableModel(self.manager.conn)
+        self.model = SQLiteTableModel(self.manager.conn, self.manager)
         self.proxy_model = EnhancedProxyModel(self)
         self.proxy_model.setSourceModel(self.model)
         self.tree_model = QStandardItemModel()
@@ -796,12 +831,13 @@ class ViewWindow(QMainWindow):
 
     def migrate_data(self):
         """Миграция данных из JSON."""
-        manager = None
         try:
-            manager = DataManager(self.db_file)
             app_dir = get_app_dir()
             json_file = os.path.join(app_dir, 'elements.json')
-            if manager.migrate_from_json(json_file):
+            # Через общий менеджер: отложенные правки таблицы фиксируются до миграции,
+            # а кэш элементов, общий с другими окнами, пополняется новыми записями
+            migrated = self.manager.migrate_from_json(json_file)
+            if migrated:
                 QMessageBox.information(self, "✅ Успех", f"Данные мигрированы в:\n{self.db_file}")
                 self.refresh_data()
             else:
@@ -809,9 +845,6 @@ class ViewWindow(QMainWindow):
         except Exception as e:
             logger.error(f"Ошибка миграции: {e}")
             QMessageBox.critical(self, "❌ Ошибка", f"Не удалось выполнить миграцию:\n{str(e)}")
-        finally:
-            if manager:
-                manager.close()
 
     def _on_tree_double_click(self, index):
         """Обработка двойного клика по дереву."""
@@ -881,6 +914,7 @@ class ViewWindow(QMainWindow):
     def closeEvent(self, event):
         """Обработка закрытия окна."""
         try:
+            self.model.flush_pending()
             self._get_cached_parent_name.cache_clear()
             logger.info("ViewWindow закрыто")
         except Exception as e:
@@ -192,7 +192,9 @@ class BoxInfoHandler(http.server.SimpleHTTPRequestHandler):
     def send_box_info_json(self, box_id):
         """Отправка информации о коробке в формате JSON для мобильного приложения."""
         try:
-            # Получение информации о коробке
+            # Получение информации о коробке (данные могут меняться из приложения,
+            # поэтому кэш менеджера сбрасывается на каждый запрос)
+            self.manager.invalidate_cache()
             box = self.manager.find_by_id(box_id)
             if not box:
                 self.send_response(404)
@@ -262,7 +264,9 @@ class BoxInfoHandler(http.server.SimpleHTTPRequestHandler):
     def send_box_info(self, box_id):
         """Отправка информации о коробке."""
         try:
-            # Получение информации о коробке
+            # Получение информации о коробке (данные могут меняться из приложения,
+            # поэтому кэш менеджера сбрасывается на каждый запрос)
+            self.manager.invalidate_cache()
             box = self.manager.find_by_id(box_id)
             if not box:
                 self.send_error(404, f"Коробка с ID {box_id} не найдена")